@@ -0,0 +1,336 @@
+"""squashed schema 0001-0016
+
+Итоговая схема цепочки миграций 0001_initial .. 0016_created_at_brin одним проходом.
+Применяется только к пустой БД через scripts/bootstrap_db.py, после чего БД помечается
+ревизией SQUASHED_REVISION, а более новые миграции накатываются обычным alembic upgrade.
+Существующие БД продолжают обновляться по линейной цепочке в alembic/versions.
+
+При добавлении миграции этот файл не меняется: он описывает состояние на SQUASHED_REVISION.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# Ревизия цепочки, которой соответствует эта схема
+SQUASHED_REVISION = '0016_created_at_brin'
+
+
+def _uuid_pk() -> sa.Column:
+    return sa.Column(
+        'id', postgresql.UUID(as_uuid=True), primary_key=True, server_default=sa.text('gen_uuid_v7()')
+    )
+
+
+def _uuid_fk(name: str, target: str, **kwargs) -> sa.Column:
+    return sa.Column(name, postgresql.UUID(as_uuid=True), sa.ForeignKey(target), **kwargs)
+
+
+def _timestamp(name: str, **kwargs) -> sa.Column:
+    kwargs.setdefault('nullable', False)
+    kwargs.setdefault('server_default', sa.func.now())
+    return sa.Column(name, sa.DateTime(timezone=True), **kwargs)
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS citext')
+    op.execute("""
+        CREATE OR REPLACE FUNCTION gen_uuid_v7() RETURNS uuid AS $$
+            SELECT encode(
+                set_bit(
+                    set_bit(
+                        overlay(
+                            uuid_send(gen_random_uuid())
+                            PLACING substring(int8send(floor(extract(epoch FROM clock_timestamp()) * 1000)::bigint) FROM 3)
+                            FROM 1 FOR 6
+                        ),
+                        52, 1
+                    ),
+                    53, 1
+                ),
+                'hex'
+            )::uuid
+        $$ LANGUAGE sql VOLATILE
+    """)
+
+    userrole_new = postgresql.ENUM(
+        'student', 'guardian', 'teacher', 'class_teacher', 'subject_teacher',
+        'head_teacher', 'director', 'deputy_director', 'methodist', 'scheduler',
+        'psychologist', 'librarian', 'admin', 'secretary',
+        name='userrole_new',
+    )
+    attendancestatus = postgresql.ENUM('present', 'absent', 'late', name='attendancestatus')
+    messagedeliverystatus = postgresql.ENUM('pending', 'sent', 'failed', name='messagedeliverystatus')
+
+    # Пользователи и профили
+    op.create_table(
+        'users',
+        _uuid_pk(),
+        sa.Column('email', postgresql.CITEXT(), nullable=False, unique=True),
+        sa.Column('full_name', sa.String(length=255), nullable=False),
+        sa.Column('password_hash', sa.String(length=255), nullable=False),
+        _timestamp('created_at'),
+    )
+    op.create_table(
+        'user_role_assignments',
+        sa.Column(
+            'user_id', postgresql.UUID(as_uuid=True),
+            sa.ForeignKey('users.id', ondelete='CASCADE', name='user_role_assignments_user_id_fkey'),
+            nullable=False,
+        ),
+        sa.Column('role', userrole_new, nullable=False),
+        _timestamp('assigned_at'),
+        sa.Column(
+            'assigned_by', postgresql.UUID(as_uuid=True),
+            sa.ForeignKey('users.id', ondelete='SET NULL', name='user_role_assignments_assigned_by_fkey'),
+            nullable=True,
+        ),
+        sa.PrimaryKeyConstraint('user_id', 'role', name='user_role_assignments_pkey'),
+    )
+    op.create_table(
+        'user_profiles',
+        _uuid_fk('user_id', 'users.id', primary_key=True, unique=True),
+        sa.Column('date_of_birth', sa.Date(), nullable=True),
+        sa.Column('show_birthday', sa.Boolean(), nullable=False, server_default=sa.text('true')),
+        sa.Column('avatar_url', sa.String(length=500), nullable=True),
+        _timestamp('updated_at'),
+    )
+
+    # Школы, классы, предметы
+    op.create_table(
+        'schools',
+        _uuid_pk(),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('address', sa.String(length=255)),
+        _timestamp('created_at'),
+    )
+    op.create_table(
+        'classes',
+        _uuid_pk(),
+        _uuid_fk('school_id', 'schools.id', nullable=False),
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('grade_level', sa.Integer(), nullable=False),
+        _timestamp('created_at'),
+        sa.UniqueConstraint('school_id', 'name', name='uq_class_school_name'),
+    )
+    op.create_table(
+        'subjects',
+        _uuid_pk(),
+        sa.Column('name', sa.String(length=255), nullable=False, unique=True),
+        _timestamp('created_at'),
+    )
+
+    # Участники
+    op.create_table(
+        'teachers',
+        _uuid_pk(),
+        _uuid_fk('user_id', 'users.id', nullable=False, unique=True),
+        _uuid_fk('school_id', 'schools.id', nullable=False),
+        _timestamp('hired_at'),
+    )
+    op.create_table(
+        'students',
+        _uuid_pk(),
+        _uuid_fk('user_id', 'users.id', nullable=False, unique=True),
+        _uuid_fk('school_id', 'schools.id', nullable=False),
+        _timestamp('enrolled_at'),
+    )
+    op.create_table(
+        'guardians',
+        _uuid_pk(),
+        _uuid_fk('user_id', 'users.id', nullable=False, unique=True),
+    )
+    op.create_table(
+        'student_guardians',
+        _uuid_fk('student_id', 'students.id', primary_key=True),
+        _uuid_fk('guardian_id', 'guardians.id', primary_key=True),
+    )
+    op.create_table(
+        'class_students',
+        _uuid_fk('class_id', 'classes.id', primary_key=True),
+        _uuid_fk('student_id', 'students.id', primary_key=True),
+    )
+    op.create_table(
+        'class_subjects',
+        _uuid_fk('class_id', 'classes.id', primary_key=True),
+        _uuid_fk('subject_id', 'subjects.id', primary_key=True),
+        _uuid_fk('teacher_id', 'teachers.id'),
+    )
+
+    # Учебный процесс
+    op.create_table(
+        'lessons',
+        _uuid_pk(),
+        _uuid_fk('class_id', 'classes.id', nullable=False),
+        _uuid_fk('subject_id', 'subjects.id', nullable=False),
+        _uuid_fk('teacher_id', 'teachers.id', nullable=False),
+        sa.Column('topic', sa.String(length=255), nullable=False),
+        _timestamp('start_at', server_default=None),
+        _timestamp('end_at', server_default=None),
+    )
+    op.create_table(
+        'grades',
+        _uuid_pk(),
+        _uuid_fk('student_id', 'students.id', nullable=False),
+        _uuid_fk('lesson_id', 'lessons.id', nullable=False),
+        sa.Column('value', sa.Integer(), nullable=False),
+        sa.Column('comment', sa.Text()),
+        _timestamp('created_at'),
+    )
+    op.create_table(
+        'attendance',
+        _uuid_pk(),
+        _uuid_fk('student_id', 'students.id', nullable=False),
+        sa.Column('status', attendancestatus, nullable=False),
+        _uuid_fk('lesson_id', 'lessons.id', nullable=False),
+        _timestamp('noted_at'),
+        sa.UniqueConstraint('lesson_id', 'student_id', name='uq_attendance_lesson_student'),
+    )
+    op.create_table(
+        'homeworks',
+        _uuid_pk(),
+        _uuid_fk('lesson_id', 'lessons.id', nullable=False, unique=True),
+        sa.Column('description', sa.Text(), nullable=False),
+        sa.Column('due_date', sa.Date(), nullable=False),
+    )
+    op.create_table(
+        'homework_submissions',
+        _uuid_pk(),
+        _uuid_fk('homework_id', 'homeworks.id', nullable=False),
+        _uuid_fk('student_id', 'students.id', nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        _timestamp('submitted_at'),
+        sa.Column('grade', sa.Integer()),
+        sa.UniqueConstraint('homework_id', 'student_id', name='uq_homework_submission'),
+    )
+    op.create_table(
+        'interim_assessments',
+        _uuid_pk(),
+        _uuid_fk('student_id', 'students.id', nullable=False),
+        _uuid_fk('subject_id', 'subjects.id', nullable=False),
+        sa.Column('school_year', sa.Integer(), nullable=False),
+        sa.Column('semester', sa.Integer(), nullable=False),
+        sa.Column('grade', sa.Integer(), nullable=False),
+        sa.Column('comment', sa.Text(), nullable=True),
+        _timestamp('created_at'),
+        sa.UniqueConstraint('student_id', 'subject_id', 'school_year', 'semester', name='uq_interim_assessment'),
+    )
+
+    # Сообщения и почта
+    op.create_table(
+        'messages',
+        _uuid_pk(),
+        _uuid_fk('sender_id', 'users.id', nullable=False),
+        sa.Column('subject', sa.String(length=255), nullable=False),
+        sa.Column('body', sa.Text(), nullable=False),
+        _timestamp('created_at'),
+    )
+    op.create_table(
+        'message_recipients',
+        _uuid_fk('message_id', 'messages.id', primary_key=True),
+        _uuid_fk('recipient_user_id', 'users.id', primary_key=True),
+        sa.Column('read', sa.Boolean(), nullable=False, server_default=sa.text('false')),
+    )
+    op.create_table(
+        'email_outbox',
+        _uuid_pk(),
+        _uuid_fk('message_id', 'messages.id', nullable=False),
+        sa.Column('subject', sa.String(length=255), nullable=False),
+        sa.Column('body', sa.Text(), nullable=False),
+        sa.Column('status', messagedeliverystatus, nullable=False, server_default='pending'),
+        sa.Column('retries', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_error', sa.Text()),
+        _timestamp('created_at'),
+        _timestamp('sent_at', nullable=True, server_default=None),
+    )
+    op.create_table(
+        'email_outbox_recipients',
+        sa.Column(
+            'outbox_id', postgresql.UUID(as_uuid=True),
+            sa.ForeignKey('email_outbox.id', ondelete='CASCADE'),
+            primary_key=True,
+        ),
+        sa.Column('email', sa.Text(), primary_key=True),
+    )
+    op.create_table(
+        'password_reset_tokens',
+        _uuid_pk(),
+        _uuid_fk('user_id', 'users.id', nullable=False, unique=True),
+        sa.Column('token', sa.String(length=64), nullable=False, unique=True),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('used', sa.Boolean(), nullable=False, server_default=sa.text('false')),
+        _timestamp('created_at'),
+    )
+    op.create_table(
+        'direct_messages',
+        _uuid_pk(),
+        _uuid_fk('sender_id', 'users.id', nullable=False),
+        _uuid_fk('recipient_id', 'users.id', nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('read', sa.Boolean(), nullable=False, server_default=sa.text('false')),
+        _timestamp('created_at'),
+    )
+    op.create_table(
+        'news',
+        _uuid_pk(),
+        _uuid_fk('school_id', 'schools.id', nullable=False),
+        _uuid_fk('author_id', 'users.id', nullable=False),
+        sa.Column('title', sa.String(length=255), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('preview_image_url', sa.String(length=500), nullable=True),
+        sa.Column('published_at', sa.DateTime(timezone=True), nullable=True),
+        _timestamp('created_at'),
+    )
+
+    # Индексы (0004, 0007, 0008, 0012, 0014, 0016)
+    op.create_index('ix_direct_messages_sender_recipient', 'direct_messages', ['sender_id', 'recipient_id'])
+    op.create_index(
+        'ix_direct_messages_inbox_unread',
+        'direct_messages',
+        ['recipient_id', sa.text('created_at DESC')],
+        postgresql_where=sa.text('read = false'),
+    )
+    op.create_index('ix_news_school_published', 'news', ['school_id', 'published_at'])
+    op.create_index('ix_news_published_brin', 'news', ['published_at'], postgresql_using='brin')
+
+    for index_name, table_name, columns in (
+        ('ix_user_role_assignments_assigned_by', 'user_role_assignments', ['assigned_by']),
+        ('ix_students_school_id', 'students', ['school_id']),
+        ('ix_teachers_school_id', 'teachers', ['school_id']),
+        ('ix_student_guardians_guardian_id', 'student_guardians', ['guardian_id']),
+        ('ix_class_students_student_id', 'class_students', ['student_id']),
+        ('ix_class_subjects_subject_id', 'class_subjects', ['subject_id']),
+        ('ix_class_subjects_teacher_id', 'class_subjects', ['teacher_id']),
+        ('ix_lessons_class_start', 'lessons', ['class_id', 'start_at']),
+        ('ix_lessons_subject_id', 'lessons', ['subject_id']),
+        ('ix_lessons_teacher_id', 'lessons', ['teacher_id']),
+        ('ix_grades_student_lesson', 'grades', ['student_id', 'lesson_id']),
+        ('ix_grades_lesson_id', 'grades', ['lesson_id']),
+        ('ix_attendance_student_id', 'attendance', ['student_id']),
+        ('ix_homework_submissions_student_id', 'homework_submissions', ['student_id']),
+        ('ix_messages_sender_id', 'messages', ['sender_id']),
+        ('ix_message_recipients_recipient_user_id', 'message_recipients', ['recipient_user_id']),
+        ('ix_email_outbox_message_id', 'email_outbox', ['message_id']),
+        ('ix_direct_messages_recipient_id', 'direct_messages', ['recipient_id']),
+        ('ix_news_author_id', 'news', ['author_id']),
+        ('ix_interim_assessments_subject_id', 'interim_assessments', ['subject_id']),
+    ):
+        op.create_index(index_name, table_name, columns)
+
+    op.create_index(
+        'ix_email_outbox_pending',
+        'email_outbox',
+        ['created_at'],
+        postgresql_where=sa.text("status IN ('pending', 'failed')"),
+    )
+    for index_name, table_name in (
+        ('ix_messages_created_brin', 'messages'),
+        ('ix_direct_messages_created_brin', 'direct_messages'),
+        ('ix_email_outbox_created_brin', 'email_outbox'),
+    ):
+        op.create_index(
+            index_name, table_name, ['created_at'], postgresql_using='brin', postgresql_with={'pages_per_range': 32}
+        )
+
+    # Индексы кластеризации (0011, 0013) - таблицы пусты, достаточно запомнить индекс
+    op.execute('ALTER TABLE grades CLUSTER ON ix_grades_student_lesson')
+    op.execute('ALTER TABLE attendance CLUSTER ON uq_attendance_lesson_student')
@@ -178,24 +178,27 @@ def upgrade() -> None:
 
 
 def downgrade() -> None:
-    op.drop_table("email_outbox")
-    op.drop_table("message_recipients")
-    op.drop_table("messages")
-    op.drop_table("homework_submissions")
-    op.drop_table("homeworks")
-    op.drop_table("attendance")
-    op.drop_table("grades")
-    op.drop_table("lessons")
-    op.drop_table("class_subjects")
-    op.drop_table("class_students")
-    op.drop_table("student_guardians")
-    op.drop_table("guardians")
-    op.drop_table("students")
-    op.drop_table("teachers")
-    op.drop_table("subjects")
-    op.drop_table("classes")
-    op.drop_table("schools")
-    op.drop_table("users")
-    op.execute("DROP TYPE IF EXISTS userrole")
-    op.execute("DROP TYPE IF EXISTS attendancestatus")
-    op.execute("DROP TYPE IF EXISTS messagedeliverystatus")
+    # Одним DROP TABLE: связи между удаляемыми таблицами PostgreSQL разрешает сам,
+    # CASCADE не нужен и не заденет посторонние объекты
+    op.execute("""
+        DROP TABLE IF EXISTS
+            email_outbox,
+            message_recipients,
+            messages,
+            homework_submissions,
+            homeworks,
+            attendance,
+            grades,
+            lessons,
+            class_subjects,
+            class_students,
+            student_guardians,
+            guardians,
+            students,
+            teachers,
+            subjects,
+            classes,
+            schools,
+            users
+    """)
+    op.execute("DROP TYPE IF EXISTS userrole, attendancestatus, messagedeliverystatus")
@@ -17,11 +17,24 @@ depends_on = None
 
 
 def upgrade() -> None:
-    # Создаем новый enum с расширенными ролями (если еще не существует)
+    # Все проверки состояния схемы - одним запросом к каталогу
     conn = op.get_bind()
-    result = conn.execute(
-        sa.text("SELECT EXISTS (SELECT 1 FROM pg_type WHERE typname = 'userrole_new')")
-    ).scalar()
+    state = conn.execute(
+        sa.text("""
+            SELECT
+                EXISTS (SELECT 1 FROM pg_type WHERE typname = 'userrole_new') AS has_new_enum,
+                EXISTS (
+                    SELECT 1 FROM information_schema.tables
+                    WHERE table_schema = current_schema() AND table_name = 'user_role_assignments'
+                ) AS has_table,
+                EXISTS (
+                    SELECT 1 FROM information_schema.columns
+                    WHERE table_schema = current_schema() AND table_name = 'users' AND column_name = 'role'
+                ) AS has_role_column
+        """)
+    ).one()
+    
+    # Создаем новый enum с расширенными ролями (если еще не существует)
     
     userrole_new = postgresql.ENUM(
         "student", "guardian", "teacher", "class_teacher", "subject_teacher",
@@ -31,64 +44,60 @@ def upgrade() -> None:
         create_type=False,  # Не создаем автоматически, делаем вручную
     )
     
-    if not result:
+    if not state.has_new_enum:
         userrole_new.create(conn, checkfirst=True)
     
-    # Проверяем, существует ли таблица user_role_assignments
-    inspector = sa.inspect(conn)
-    has_table = "user_role_assignments" in inspector.get_table_names()
-    
-    if not has_table:
-        # Создаем таблицу для назначения ролей
+    if not state.has_table:
+        # Создаем таблицу для назначения ролей без PK и FK: при переносе данных
+        # индекс строится один раз по готовым данным, а не обновляется на каждую строку
         op.create_table(
             "user_role_assignments",
-            sa.Column("user_id", postgresql.UUID(as_uuid=True), primary_key=True),
-            sa.Column("role", userrole_new, primary_key=True),
+            sa.Column("user_id", postgresql.UUID(as_uuid=True), nullable=False),
+            sa.Column("role", userrole_new, nullable=False),
             sa.Column("assigned_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
             sa.Column("assigned_by", postgresql.UUID(as_uuid=True), nullable=True),
-            sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
-            sa.ForeignKeyConstraint(["assigned_by"], ["users.id"], ondelete="SET NULL"),
         )
     
-        # Переносим данные из users.role в user_role_assignments (если поле role еще существует)
-        inspector = sa.inspect(conn)
-        users_columns = [col["name"] for col in inspector.get_columns("users")]
-        
-        if "role" in users_columns:
-            # Проверяем, есть ли уже данные в user_role_assignments
-            count_result = conn.execute(
-                sa.text("SELECT COUNT(*) FROM user_role_assignments")
-            ).scalar()
-            
-            if count_result == 0:
-                # Переносим данные из users.role в user_role_assignments
-                # Маппинг старых ролей на новые (для совместимости)
-                op.execute("""
-                    INSERT INTO user_role_assignments (user_id, role, assigned_at)
-                    SELECT 
-                        id, 
-                        CASE 
-                            WHEN role::text = 'student' THEN 'student'::userrole_new
-                            WHEN role::text = 'guardian' THEN 'guardian'::userrole_new
-                            WHEN role::text = 'teacher' THEN 'teacher'::userrole_new
-                            WHEN role::text = 'admin' THEN 'admin'::userrole_new
-                            ELSE 'admin'::userrole_new
-                        END,
-                        created_at
-                    FROM users
-                    WHERE role IS NOT NULL
-                """)
+        # Переносим данные из users.role в user_role_assignments (если поле role еще существует).
+        # Таблица только что создана и пуста, поэтому отдельный COUNT(*) не нужен.
+        if state.has_role_column:
+            # Не ждем сброса WAL на диск для массовой вставки (только в этой транзакции)
+            op.execute("SET LOCAL synchronous_commit = off")
+            # Маппинг старых ролей на новые (для совместимости) - таблица-константа,
+            # с которой users соединяется один раз, вместо CASE на каждую строку
+            op.execute("""
+                INSERT INTO user_role_assignments (user_id, role, assigned_at)
+                SELECT u.id, m.new_role::userrole_new, u.created_at
+                FROM users u
+                JOIN (
+                    VALUES ('student', 'student'),
+                           ('guardian', 'guardian'),
+                           ('teacher', 'teacher'),
+                           ('admin', 'admin')
+                ) AS m (old_role, new_role) ON u.role::text = m.old_role
+                WHERE u.role IS NOT NULL
+            """)
             
             # Удаляем старое поле role из users
             op.drop_column("users", "role")
         
-        # Удаляем старый enum (если он больше не используется)
-        old_enum_exists = conn.execute(
-            sa.text("SELECT EXISTS (SELECT 1 FROM pg_type WHERE typname = 'userrole')")
-        ).scalar()
+        # Ограничения добавляем после загрузки данных
+        op.create_primary_key("user_role_assignments_pkey", "user_role_assignments", ["user_id", "role"])
+        op.create_foreign_key(
+            "user_role_assignments_user_id_fkey",
+            "user_role_assignments", "users",
+            ["user_id"], ["id"],
+            ondelete="CASCADE",
+        )
+        op.create_foreign_key(
+            "user_role_assignments_assigned_by_fkey",
+            "user_role_assignments", "users",
+            ["assigned_by"], ["id"],
+            ondelete="SET NULL",
+        )
         
-        if old_enum_exists:
-            op.execute("DROP TYPE IF EXISTS userrole")
+        # Удаляем старый enum (если он больше не используется)
+        op.execute("DROP TYPE IF EXISTS userrole")
 
 
 def downgrade() -> None:
@@ -102,22 +111,37 @@ def downgrade() -> None:
         sa.Column("role", userrole_old, nullable=True),
     )
     
-    # Переносим данные обратно (берем первую роль из назначений, маппим на старые роли)
+    # Переносим данные обратно (берем первую роль из назначений, маппим на старые роли,
+    # неизвестные роли - в admin).
+    # DISTINCT ON выбирает первую роль каждого пользователя за один проход по таблице
+    # вместо коррелированного подзапроса на каждую строку users
     op.execute("""
         UPDATE users u
-        SET role = (
-            SELECT CASE 
-                WHEN ura.role::text IN ('student') THEN 'student'::userrole
-                WHEN ura.role::text IN ('guardian') THEN 'guardian'::userrole
-                WHEN ura.role::text IN ('teacher', 'class_teacher', 'subject_teacher', 'head_teacher', 'director', 'deputy_director', 'methodist', 'scheduler', 'psychologist', 'librarian', 'secretary') THEN 'teacher'::userrole
-                WHEN ura.role::text IN ('admin') THEN 'admin'::userrole
-                ELSE 'admin'::userrole
-            END
+        SET role = mapped.role
+        FROM (
+            SELECT DISTINCT ON (ura.user_id)
+                ura.user_id,
+                COALESCE(m.old_role, 'admin')::userrole AS role
             FROM user_role_assignments ura
-            WHERE ura.user_id = u.id
-            ORDER BY ura.assigned_at
-            LIMIT 1
-        )
+            LEFT JOIN (
+                VALUES ('student', 'student'),
+                       ('guardian', 'guardian'),
+                       ('teacher', 'teacher'),
+                       ('class_teacher', 'teacher'),
+                       ('subject_teacher', 'teacher'),
+                       ('head_teacher', 'teacher'),
+                       ('director', 'teacher'),
+                       ('deputy_director', 'teacher'),
+                       ('methodist', 'teacher'),
+                       ('scheduler', 'teacher'),
+                       ('psychologist', 'teacher'),
+                       ('librarian', 'teacher'),
+                       ('secretary', 'teacher'),
+                       ('admin', 'admin')
+            ) AS m (new_role, old_role) ON ura.role::text = m.new_role
+            ORDER BY ura.user_id, ura.assigned_at
+        ) mapped
+        WHERE mapped.user_id = u.id
     """)
     
     # Делаем поле NOT NULL
@@ -16,6 +16,16 @@ branch_labels = None
 depends_on = None
 
 
+def _get_existing_columns(table_names: set[str]) -> dict[str, set[str]]:
+    """Один раз читает метаданные: существующие таблицы и их колонки."""
+    inspector = sa.inspect(op.get_bind())
+    existing_tables = set(inspector.get_table_names()) & table_names
+    return {
+        table_name: {col["name"] for col in inspector.get_columns(table_name)}
+        for table_name in existing_tables
+    }
+
+
 def upgrade() -> None:
     # Список всех таблиц и колонок с DateTime, которые нужно мигрировать
     datetime_columns = [
@@ -37,28 +47,26 @@ def upgrade() -> None:
         ("email_outbox", "sent_at"),
     ]
     
-    # Мигрируем каждую колонку с TIMESTAMP на TIMESTAMP WITH TIME ZONE
+    # Группируем колонки по таблицам: один ALTER TABLE на таблицу,
+    # чтобы PostgreSQL переписывал каждую таблицу один раз, а не на каждую колонку
+    existing_columns = _get_existing_columns({table_name for table_name, _ in datetime_columns})
+    columns_by_table: dict[str, list[str]] = {}
     for table_name, column_name in datetime_columns:
         # Проверяем, существует ли таблица и колонка
-        conn = op.get_bind()
-        inspector = sa.inspect(conn)
-        
-        if table_name not in inspector.get_table_names():
-            continue
-        
-        columns = [col["name"] for col in inspector.get_columns(table_name)]
-        if column_name not in columns:
+        if column_name not in existing_columns.get(table_name, set()):
             continue
         
-        # Изменяем тип колонки на TIMESTAMP WITH TIME ZONE
-        # PostgreSQL автоматически конвертирует существующие значения
-        op.execute(
-            sa.text(f"""
-                ALTER TABLE {table_name}
-                ALTER COLUMN {column_name} TYPE TIMESTAMP WITH TIME ZONE
-                USING {column_name} AT TIME ZONE 'UTC'
-            """)
+        columns_by_table.setdefault(table_name, []).append(column_name)
+    
+    # Изменяем тип колонок на TIMESTAMP WITH TIME ZONE
+    # PostgreSQL автоматически конвертирует существующие значения
+    for table_name, column_names in columns_by_table.items():
+        alter_clauses = ", ".join(
+            f"ALTER COLUMN {column_name} TYPE TIMESTAMP WITH TIME ZONE "
+            f"USING {column_name} AT TIME ZONE 'UTC'"
+            for column_name in column_names
         )
+        op.execute(sa.text(f"ALTER TABLE {table_name} {alter_clauses}"))
 
 
 def downgrade() -> None:
@@ -82,22 +90,19 @@ def downgrade() -> None:
         ("email_outbox", "sent_at"),
     ]
     
+    existing_columns = _get_existing_columns({table_name for table_name, _ in datetime_columns})
+    columns_by_table: dict[str, list[str]] = {}
     for table_name, column_name in datetime_columns:
-        conn = op.get_bind()
-        inspector = sa.inspect(conn)
-        
-        if table_name not in inspector.get_table_names():
+        if column_name not in existing_columns.get(table_name, set()):
             continue
         
-        columns = [col["name"] for col in inspector.get_columns(table_name)]
-        if column_name not in columns:
-            continue
-        
-        # Конвертируем обратно в TIMESTAMP без timezone
-        op.execute(
-            sa.text(f"""
-                ALTER TABLE {table_name}
-                ALTER COLUMN {column_name} TYPE TIMESTAMP
-                USING {column_name} AT TIME ZONE 'UTC'
-            """)
+        columns_by_table.setdefault(table_name, []).append(column_name)
+    
+    # Конвертируем обратно в TIMESTAMP без timezone
+    for table_name, column_names in columns_by_table.items():
+        alter_clauses = ", ".join(
+            f"ALTER COLUMN {column_name} TYPE TIMESTAMP "
+            f"USING {column_name} AT TIME ZONE 'UTC'"
+            for column_name in column_names
         )
+        op.execute(sa.text(f"ALTER TABLE {table_name} {alter_clauses}"))
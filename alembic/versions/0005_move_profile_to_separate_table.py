@@ -19,10 +19,11 @@ depends_on: Union[str, Sequence[str], None] = None
 
 
 def upgrade() -> None:
-    # Создаем таблицу user_profiles
+    # Создаем таблицу user_profiles. Внешний ключ добавляем после переноса данных:
+    # одна проверка всей таблицы вместо FK-триггера на каждую вставленную строку
     op.create_table(
         'user_profiles',
-        sa.Column('user_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('users.id'), primary_key=True, unique=True),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), primary_key=True, unique=True),
         sa.Column('date_of_birth', sa.Date(), nullable=True),
         sa.Column('show_birthday', sa.Boolean(), nullable=False, server_default=sa.text('true')),
         sa.Column('avatar_url', sa.String(length=500), nullable=True),
@@ -34,7 +35,8 @@ def upgrade() -> None:
     result = conn.execute(sa.text("""
         SELECT column_name 
         FROM information_schema.columns 
-        WHERE table_name = 'users' 
+        WHERE table_schema = current_schema()
+        AND table_name = 'users' 
         AND column_name IN ('date_of_birth', 'show_birthday', 'avatar_url')
     """))
     existing_columns = {row[0] for row in result}
@@ -73,13 +75,19 @@ def upgrade() -> None:
             WHERE {where_clause}
         """))
     
-    # Удаляем поля из таблицы users, если они существуют
-    if 'avatar_url' in existing_columns:
-        op.drop_column('users', 'avatar_url')
-    if 'show_birthday' in existing_columns:
-        op.drop_column('users', 'show_birthday')
-    if 'date_of_birth' in existing_columns:
-        op.drop_column('users', 'date_of_birth')
+    op.create_foreign_key('user_profiles_user_id_fkey', 'user_profiles', 'users', ['user_id'], ['id'])
+    
+    # Удаляем поля из таблицы users, если они существуют - одним ALTER TABLE
+    # по результату той же проверки, без повторных запросов к каталогу
+    columns_to_drop = [
+        column_name
+        for column_name in ('avatar_url', 'show_birthday', 'date_of_birth')
+        if column_name in existing_columns
+    ]
+    if columns_to_drop:
+        op.execute(
+            'ALTER TABLE users ' + ', '.join(f'DROP COLUMN {column_name}' for column_name in columns_to_drop)
+        )
 
 
 def downgrade() -> None:
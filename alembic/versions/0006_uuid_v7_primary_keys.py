@@ -0,0 +1,73 @@
+"""uuid v7 primary keys
+
+Revision ID: 0006_uuid_v7_primary_keys
+Revises: 0005_profile_separate
+Create Date: 2026-01-12 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0006_uuid_v7_primary_keys'
+down_revision: Union[str, None] = '0005_profile_separate'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Таблицы с UUID первичным ключом в колонке id
+UUID_PK_TABLES = (
+    'users',
+    'schools',
+    'classes',
+    'subjects',
+    'teachers',
+    'students',
+    'guardians',
+    'lessons',
+    'grades',
+    'attendance',
+    'homeworks',
+    'homework_submissions',
+    'messages',
+    'email_outbox',
+    'password_reset_tokens',
+    'direct_messages',
+    'news',
+    'interim_assessments',
+)
+
+
+def upgrade() -> None:
+    # UUIDv7: первые 48 бит - unix-время в миллисекундах, остальное - случайные биты
+    # из gen_random_uuid(). Новые ключи монотонно растут, и вставки попадают
+    # в правые страницы B-tree индекса вместо случайных.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION gen_uuid_v7() RETURNS uuid AS $$
+            SELECT encode(
+                set_bit(
+                    set_bit(
+                        overlay(
+                            uuid_send(gen_random_uuid())
+                            PLACING substring(int8send(floor(extract(epoch FROM clock_timestamp()) * 1000)::bigint) FROM 3)
+                            FROM 1 FOR 6
+                        ),
+                        52, 1
+                    ),
+                    53, 1
+                ),
+                'hex'
+            )::uuid
+        $$ LANGUAGE sql VOLATILE
+    """)
+
+    # Существующие строки не трогаем - меняем только значение по умолчанию
+    for table_name in UUID_PK_TABLES:
+        op.execute(f'ALTER TABLE {table_name} ALTER COLUMN id SET DEFAULT gen_uuid_v7()')
+
+
+def downgrade() -> None:
+    for table_name in UUID_PK_TABLES:
+        op.execute(f'ALTER TABLE {table_name} ALTER COLUMN id DROP DEFAULT')
+
+    op.execute('DROP FUNCTION IF EXISTS gen_uuid_v7()')
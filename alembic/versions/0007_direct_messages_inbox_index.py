@@ -0,0 +1,57 @@
+"""direct messages unread inbox index
+
+Revision ID: 0007_dm_inbox_index
+Revises: 0006_uuid_v7_primary_keys
+Create Date: 2026-01-12 12:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0007_dm_inbox_index'
+down_revision: Union[str, None] = '0006_uuid_v7_primary_keys'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Частичный индекс только по непрочитанным сообщениям: покрывает
+    # WHERE recipient_id = ? AND read = false ORDER BY created_at DESC без сортировки
+    # и не растет за счет прочитанных сообщений.
+    # Индекс по (sender_id, recipient_id) остается - переписка фильтрует без учета read.
+    # CONCURRENTLY не блокирует запись в таблицу, но не работает внутри транзакции.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_direct_messages_inbox_unread',
+            'direct_messages',
+            ['recipient_id', sa.text('created_at DESC')],
+            postgresql_where=sa.text('read = false'),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            'ix_direct_messages_recipient_read',
+            table_name='direct_messages',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_direct_messages_recipient_read',
+            'direct_messages',
+            ['recipient_id', 'read'],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            'ix_direct_messages_inbox_unread',
+            table_name='direct_messages',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
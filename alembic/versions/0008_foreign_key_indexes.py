@@ -0,0 +1,68 @@
+"""foreign key indexes
+
+Revision ID: 0008_foreign_key_indexes
+Revises: 0007_dm_inbox_index
+Create Date: 2026-01-12 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0008_foreign_key_indexes'
+down_revision: Union[str, None] = '0007_dm_inbox_index'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# PostgreSQL не индексирует ссылающуюся сторону внешнего ключа.
+# Колонки, которые уже стоят первыми в PK/UNIQUE/другом индексе, пропущены.
+FOREIGN_KEY_INDEXES = (
+    ('ix_user_role_assignments_assigned_by', 'user_role_assignments', ['assigned_by']),
+    ('ix_students_school_id', 'students', ['school_id']),
+    ('ix_teachers_school_id', 'teachers', ['school_id']),
+    ('ix_student_guardians_guardian_id', 'student_guardians', ['guardian_id']),
+    ('ix_class_students_student_id', 'class_students', ['student_id']),
+    ('ix_class_subjects_subject_id', 'class_subjects', ['subject_id']),
+    ('ix_class_subjects_teacher_id', 'class_subjects', ['teacher_id']),
+    # Расписание класса: WHERE class_id = ? ORDER BY start_at
+    ('ix_lessons_class_start', 'lessons', ['class_id', 'start_at']),
+    ('ix_lessons_subject_id', 'lessons', ['subject_id']),
+    ('ix_lessons_teacher_id', 'lessons', ['teacher_id']),
+    # Оценки ученика (в том числе по уроку)
+    ('ix_grades_student_lesson', 'grades', ['student_id', 'lesson_id']),
+    ('ix_grades_lesson_id', 'grades', ['lesson_id']),
+    # Журнал посещаемости урока
+    ('ix_attendance_lesson_student', 'attendance', ['lesson_id', 'student_id']),
+    ('ix_attendance_student_id', 'attendance', ['student_id']),
+    ('ix_homework_submissions_student_id', 'homework_submissions', ['student_id']),
+    ('ix_messages_sender_id', 'messages', ['sender_id']),
+    ('ix_message_recipients_recipient_user_id', 'message_recipients', ['recipient_user_id']),
+    ('ix_email_outbox_message_id', 'email_outbox', ['message_id']),
+    ('ix_direct_messages_recipient_id', 'direct_messages', ['recipient_id']),
+    ('ix_news_author_id', 'news', ['author_id']),
+    ('ix_interim_assessments_subject_id', 'interim_assessments', ['subject_id']),
+)
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for index_name, table_name, columns in FOREIGN_KEY_INDEXES:
+            op.create_index(
+                index_name,
+                table_name,
+                columns,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for index_name, table_name, _ in reversed(FOREIGN_KEY_INDEXES):
+            op.drop_index(
+                index_name,
+                table_name=table_name,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
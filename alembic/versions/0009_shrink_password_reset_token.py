@@ -0,0 +1,38 @@
+"""shrink password reset token column
+
+Revision ID: 0009_shrink_reset_token
+Revises: 0008_foreign_key_indexes
+Create Date: 2026-01-12 13:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0009_shrink_reset_token'
+down_revision: Union[str, None] = '0008_foreign_key_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # secrets.token_urlsafe(32) дает 43 символа - 64 хватает с запасом
+    op.alter_column(
+        'password_reset_tokens',
+        'token',
+        type_=sa.String(length=64),
+        existing_type=sa.String(length=255),
+        existing_nullable=False,
+    )
+
+
+def downgrade() -> None:
+    op.alter_column(
+        'password_reset_tokens',
+        'token',
+        type_=sa.String(length=255),
+        existing_type=sa.String(length=64),
+        existing_nullable=False,
+    )
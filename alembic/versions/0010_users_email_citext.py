@@ -0,0 +1,42 @@
+"""case-insensitive users.email
+
+Revision ID: 0010_users_email_citext
+Revises: 0009_shrink_reset_token
+Create Date: 2026-01-12 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '0010_users_email_citext'
+down_revision: Union[str, None] = '0009_shrink_reset_token'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # citext сравнивает без учета регистра: существующий UNIQUE индекс users_email_key
+    # перестраивается вместе с колонкой и сразу обслуживает поиск по email при логине,
+    # без lower() в запросах и без отдельного функционального индекса
+    op.execute('CREATE EXTENSION IF NOT EXISTS citext')
+    op.alter_column(
+        'users',
+        'email',
+        type_=postgresql.CITEXT(),
+        existing_type=sa.String(length=255),
+        existing_nullable=False,
+    )
+
+
+def downgrade() -> None:
+    op.alter_column(
+        'users',
+        'email',
+        type_=sa.String(length=255),
+        existing_type=postgresql.CITEXT(),
+        existing_nullable=False,
+    )
@@ -0,0 +1,30 @@
+"""cluster grades and attendance
+
+Revision ID: 0011_cluster_grades_attendance
+Revises: 0010_users_email_citext
+Create Date: 2026-01-12 14:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0011_cluster_grades_attendance'
+down_revision: Union[str, None] = '0010_users_email_citext'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Физически упорядочиваем строки по основному порядку доступа: оценки читаются
+    # по ученику, посещаемость - по уроку. Индексы созданы в 0008.
+    # CLUSTER запоминает индекс, но новые строки не упорядочивает - повторять периодически
+    # (task db:cluster) или через pg_repack. Таблицы блокируются на время перестройки.
+    op.execute('CLUSTER grades USING ix_grades_student_lesson')
+    op.execute('CLUSTER attendance USING ix_attendance_lesson_student')
+
+
+def downgrade() -> None:
+    op.execute('ALTER TABLE attendance SET WITHOUT CLUSTER')
+    op.execute('ALTER TABLE grades SET WITHOUT CLUSTER')
@@ -0,0 +1,41 @@
+"""email outbox pending index
+
+Revision ID: 0012_email_outbox_pending
+Revises: 0011_cluster_grades_attendance
+Create Date: 2026-01-12 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0012_email_outbox_pending'
+down_revision: Union[str, None] = '0011_cluster_grades_attendance'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Частичный индекс для выборки неотправленных писем по порядку создания:
+    # размер ограничен очередью, а не всей историей отправленных писем
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_email_outbox_pending',
+            'email_outbox',
+            ['created_at'],
+            postgresql_where=sa.text("status IN ('pending', 'failed')"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_email_outbox_pending',
+            table_name='email_outbox',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,60 @@
+"""unique attendance per lesson and student
+
+Revision ID: 0013_attendance_unique
+Revises: 0012_email_outbox_pending
+Create Date: 2026-01-12 15:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0013_attendance_unique'
+down_revision: Union[str, None] = '0012_email_outbox_pending'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Оставляем одну отметку на ученика и урок - самую позднюю
+    op.execute("""
+        DELETE FROM attendance a
+        USING attendance newer
+        WHERE a.lesson_id = newer.lesson_id
+          AND a.student_id = newer.student_id
+          AND (a.noted_at, a.id) < (newer.noted_at, newer.id)
+    """)
+
+    # Уникальный индекс строим без блокировки записи, затем превращаем его в ограничение
+    # (нужно для INSERT ... ON CONFLICT). Он заменяет обычный индекс из 0008.
+    with op.get_context().autocommit_block():
+        op.execute(
+            'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_attendance_lesson_student '
+            'ON attendance (lesson_id, student_id)'
+        )
+    op.execute(
+        'ALTER TABLE attendance ADD CONSTRAINT uq_attendance_lesson_student '
+        'UNIQUE USING INDEX uq_attendance_lesson_student'
+    )
+    op.execute('ALTER TABLE attendance CLUSTER ON uq_attendance_lesson_student')
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_attendance_lesson_student',
+            table_name='attendance',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_attendance_lesson_student',
+            'attendance',
+            ['lesson_id', 'student_id'],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+    op.execute('ALTER TABLE attendance CLUSTER ON ix_attendance_lesson_student')
+    op.drop_constraint('uq_attendance_lesson_student', 'attendance', type_='unique')
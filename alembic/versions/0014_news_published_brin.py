@@ -0,0 +1,53 @@
+"""replace news published_at btree with brin
+
+Revision ID: 0014_news_published_brin
+Revises: 0013_attendance_unique
+Create Date: 2026-01-12 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0014_news_published_brin'
+down_revision: Union[str, None] = '0013_attendance_unique'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Лента школы обслуживается ix_news_school_published. Для общей ленты без school_id
+    # хватает BRIN по published_at: он в разы меньше btree и почти не дорожает при вставке
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_news_published_brin',
+            'news',
+            ['published_at'],
+            postgresql_using='brin',
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            'ix_news_published_at',
+            table_name='news',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_news_published_at',
+            'news',
+            ['published_at'],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            'ix_news_published_brin',
+            table_name='news',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
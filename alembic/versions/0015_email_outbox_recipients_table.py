@@ -0,0 +1,61 @@
+"""move email outbox recipients to a child table
+
+Revision ID: 0015_outbox_recipients
+Revises: 0014_news_published_brin
+Create Date: 2026-01-12 16:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '0015_outbox_recipients'
+down_revision: Union[str, None] = '0014_news_published_brin'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'email_outbox_recipients',
+        sa.Column(
+            'outbox_id',
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey('email_outbox.id', ondelete='CASCADE'),
+            primary_key=True,
+        ),
+        sa.Column('email', sa.Text(), primary_key=True),
+    )
+
+    # Переносим получателей из JSONB массива
+    op.execute("""
+        INSERT INTO email_outbox_recipients (outbox_id, email)
+        SELECT id, jsonb_array_elements_text(recipients)
+        FROM email_outbox
+        ON CONFLICT DO NOTHING
+    """)
+
+    op.drop_column('email_outbox', 'recipients')
+
+
+def downgrade() -> None:
+    op.add_column(
+        'email_outbox',
+        sa.Column('recipients', postgresql.JSONB(), nullable=False, server_default=sa.text("'[]'::jsonb")),
+    )
+    op.execute("""
+        UPDATE email_outbox o
+        SET recipients = r.recipients
+        FROM (
+            SELECT outbox_id, jsonb_agg(email) AS recipients
+            FROM email_outbox_recipients
+            GROUP BY outbox_id
+        ) r
+        WHERE r.outbox_id = o.id
+    """)
+    op.alter_column('email_outbox', 'recipients', server_default=None)
+
+    op.drop_table('email_outbox_recipients')
@@ -0,0 +1,49 @@
+"""brin indexes on append-only timestamps
+
+Revision ID: 0016_created_at_brin
+Revises: 0015_outbox_recipients
+Create Date: 2026-01-12 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0016_created_at_brin'
+down_revision: Union[str, None] = '0015_outbox_recipients'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# BRIN эффективен, только пока физический порядок строк совпадает со временем вставки.
+# grades и attendance кластеризованы по ученику/уроку (0011), поэтому их здесь нет.
+BRIN_INDEXES = (
+    ('ix_messages_created_brin', 'messages', 'created_at'),
+    ('ix_direct_messages_created_brin', 'direct_messages', 'created_at'),
+    ('ix_email_outbox_created_brin', 'email_outbox', 'created_at'),
+)
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for index_name, table_name, column_name in BRIN_INDEXES:
+            op.create_index(
+                index_name,
+                table_name,
+                [column_name],
+                postgresql_using='brin',
+                postgresql_with={'pages_per_range': 32},
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for index_name, table_name, _ in reversed(BRIN_INDEXES):
+            op.drop_index(
+                index_name,
+                table_name=table_name,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -0,0 +1,53 @@
+"""cover class_students lookups by student
+
+Revision ID: 0017_class_students_covering
+Revises: 0016_created_at_brin
+Create Date: 2026-01-13 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '0017_class_students_covering'
+down_revision: Union[str, None] = '0016_created_at_brin'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Поиск одногруппников: классы студента (student_id -> class_id) и состав класса
+    # (class_id -> student_id). Второе направление покрывает первичный ключ (class_id, student_id),
+    # для первого заменяем ix_class_students_student_id составным индексом - index-only scan
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_class_students_student_class',
+            'class_students',
+            ['student_id', 'class_id'],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            'ix_class_students_student_id',
+            table_name='class_students',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_class_students_student_id',
+            'class_students',
+            ['student_id'],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            'ix_class_students_student_class',
+            table_name='class_students',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
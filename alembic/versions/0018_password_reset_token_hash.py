@@ -0,0 +1,45 @@
+"""store password reset token digest instead of plaintext
+
+Revision ID: 0018_reset_token_hash
+Revises: 0017_class_students_covering
+Create Date: 2026-01-13 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0018_reset_token_hash'
+down_revision: Union[str, None] = '0017_class_students_covering'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Храним SHA-256 токена (32 байта) вместо самого токена: ключ уникального индекса
+    # фиксированного размера без collation. Выданные токены не теряются: хеш считает сам
+    # PostgreSQL так же, как hash_reset_token (SHA-256 от UTF-8), и ссылки из писем продолжают работать
+    op.add_column(
+        'password_reset_tokens',
+        sa.Column('token_hash', sa.LargeBinary(length=32), nullable=True),
+    )
+    op.execute("UPDATE password_reset_tokens SET token_hash = sha256(convert_to(token, 'UTF8'))")
+    op.alter_column('password_reset_tokens', 'token_hash', nullable=False)
+    op.create_unique_constraint(
+        'uq_password_reset_tokens_token_hash', 'password_reset_tokens', ['token_hash']
+    )
+    op.drop_column('password_reset_tokens', 'token')
+
+
+def downgrade() -> None:
+    # Хеш необратим - восстановить токены в открытом виде нельзя, поэтому удаляем их:
+    # пользователи запросят восстановление заново (токены живут 24 часа)
+    op.execute('DELETE FROM password_reset_tokens')
+    op.drop_constraint('uq_password_reset_tokens_token_hash', 'password_reset_tokens', type_='unique')
+    op.drop_column('password_reset_tokens', 'token_hash')
+    op.add_column(
+        'password_reset_tokens',
+        sa.Column('token', sa.String(length=64), nullable=False, unique=True),
+    )
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Применение миграций с быстрым стартом для пустой БД.
+
+Пустая БД создается одним проходом по сжатой схеме (alembic/squashed), помечается
+соответствующей ревизией, после чего как обычно выполняется alembic upgrade head.
+Для уже инициализированной БД это просто alembic upgrade head.
+"""
+
+import asyncio
+import importlib.util
+import sys
+from pathlib import Path
+
+from sqlalchemy import pool, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from alembic import command
+from alembic.config import Config
+from alembic.operations import Operations
+from alembic.runtime.migration import MigrationContext
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+from edutrack.config.settings import get_settings
+
+SQUASHED_SCHEMA_PATH = project_root / "alembic" / "squashed" / "0016_squashed.py"
+
+
+def load_squashed_schema():
+    spec = importlib.util.spec_from_file_location("squashed_schema", SQUASHED_SCHEMA_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def apply_squashed_schema(connection, schema) -> None:
+    context = MigrationContext.configure(connection)
+    with Operations.context(context):
+        schema.upgrade()
+
+
+async def bootstrap_if_empty(schema) -> bool:
+    """Создает схему на пустой БД. Возвращает True, если схема была создана."""
+    engine = create_async_engine(get_settings().database_url, poolclass=pool.NullPool)
+    try:
+        async with engine.begin() as conn:
+            is_empty = await conn.scalar(
+                text("SELECT to_regclass('alembic_version') IS NULL AND to_regclass('users') IS NULL")
+            )
+            if not is_empty:
+                return False
+            await conn.run_sync(apply_squashed_schema, schema)
+            return True
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    config = Config(str(project_root / "alembic.ini"))
+    config.set_main_option("script_location", str(project_root / "alembic"))
+    schema = load_squashed_schema()
+
+    if asyncio.run(bootstrap_if_empty(schema)):
+        print(f"Схема создана из сжатой миграции, ревизия {schema.SQUASHED_REVISION}")
+        command.stamp(config, schema.SQUASHED_REVISION)
+
+    command.upgrade(config, "head")
+
+
+if __name__ == "__main__":
+    main()
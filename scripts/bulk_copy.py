@@ -0,0 +1,44 @@
+"""Массовая загрузка строк для скриптов наполнения БД (фикстуры, демо-данные).
+
+Небольшие наборы вставляются обычным INSERT, большие - через COPY в бинарном
+формате asyncpg: без разбора и планирования запроса на каждую строку.
+"""
+
+from collections.abc import Sequence
+from typing import Any
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+# Начиная с этого количества строк используем COPY
+COPY_THRESHOLD = 1000
+
+
+async def copy_records(
+    conn: AsyncConnection,
+    table_name: str,
+    columns: Sequence[str],
+    records: Sequence[Sequence[Any]],
+    threshold: int = COPY_THRESHOLD,
+) -> int:
+    """Вставляет записи в таблицу в рамках текущей транзакции соединения.
+
+    Имена таблицы и колонок подставляются в SQL как есть - только доверенные значения.
+    Возвращает количество вставленных строк.
+    """
+    if not records:
+        return 0
+
+    if len(records) < threshold:
+        placeholders = ", ".join(f":{column}" for column in columns)
+        await conn.execute(
+            text(f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({placeholders})"),
+            [dict(zip(columns, record, strict=True)) for record in records],
+        )
+        return len(records)
+
+    raw_connection = await conn.get_raw_connection()
+    await raw_connection.driver_connection.copy_records_to_table(
+        table_name, records=records, columns=list(columns)
+    )
+    return len(records)
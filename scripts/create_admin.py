@@ -4,8 +4,6 @@
 import asyncio
 import getpass
 import sys
-import uuid
-from datetime import datetime, timezone
 from pathlib import Path
 
 from sqlalchemy import text
@@ -44,34 +42,29 @@ async def create_superuser():
                 print(f"Ошибка: Пользователь с email '{email}' уже существует")
                 sys.exit(1)
             
-            user_id = uuid.uuid4()
-            created_at = datetime.now(timezone.utc)
-            
-            # Создаем пользователя
-            await conn.execute(
+            # Создаем пользователя (id и created_at заполняет БД)
+            user_id = await conn.scalar(
                 text("""
-                    INSERT INTO users (id, email, full_name, password_hash, created_at)
-                    VALUES (:id, :email, :full_name, :password_hash, :created_at)
+                    INSERT INTO users (email, full_name, password_hash)
+                    VALUES (:email, :full_name, :password_hash)
+                    RETURNING id
                 """),
                 {
-                    "id": user_id,
                     "email": email,
                     "full_name": full_name,
                     "password_hash": hash_password(password),
-                    "created_at": created_at,
                 }
             )
             
             # Назначаем роль admin
             await conn.execute(
                 text("""
-                    INSERT INTO user_role_assignments (user_id, role, assigned_at)
-                    VALUES (:user_id, :role, :assigned_at)
+                    INSERT INTO user_role_assignments (user_id, role)
+                    VALUES (:user_id, :role)
                 """),
                 {
                     "user_id": user_id,
                     "role": UserRole.admin.value,
-                    "assigned_at": created_at,
                 }
             )
         
@@ -13,77 +13,142 @@
 """
 
 import asyncio
+import secrets
 import sys
 import time
 from collections.abc import Sequence
+from datetime import UTC, datetime, timedelta
 from pathlib import Path
 from uuid import UUID
 
-from sqlalchemy import select
+from sqlalchemy import func, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import create_async_engine
 
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root / "src"))
 
 from edutrack.application.password_reset import PasswordResetService
-from edutrack.config.settings import Settings
-from edutrack.infrastructure.db.models import EmailOutbox, Message, MessageDeliveryStatus, User
+from edutrack.config.settings import get_settings
+from edutrack.infrastructure.db.models import (
+    EmailOutbox,
+    EmailOutboxRecipient,
+    Message,
+    MessageDeliveryStatus,
+    User,
+    UserRole,
+    UserRoleAssignment,
+)
 from edutrack.infrastructure.repositories.sqlalchemy import (
     SqlAlchemyUserRepository,
     SqlAlchemyMessageRepository,
     SqlAlchemyEmailOutboxRepository,
 )
-from edutrack.infrastructure.services.security import hash_password
+from edutrack.infrastructure.services.security import hash_password, hash_reset_token
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
-import json
 from aio_pika import DeliveryMode, Message as RabbitMQMessage, connect_robust
 
 
 def get_local_database_url() -> str:
     """Получает URL базы данных для локального подключения."""
-    settings = Settings()
     # Преобразуем Docker хосты в localhost
-    url = settings.database_url.replace("@postgres:", "@localhost:")
-    url = url.replace("postgres:5432", "localhost:5432")
-    return url
+    return get_settings().database_url.replace("@postgres:", "@localhost:").replace("postgres:5432", "localhost:5432")
 
 
 def get_local_rabbitmq_url() -> str:
     """Получает URL RabbitMQ для локального подключения."""
-    settings = Settings()
     # Преобразуем Docker хосты в localhost
-    url = settings.rabbitmq_url.replace("@rabbitmq:", "@localhost:")
-    url = url.replace("rabbitmq:5672", "localhost:5672")
-    return url
+    return get_settings().rabbitmq_url.replace("@rabbitmq:", "@localhost:").replace("rabbitmq:5672", "localhost:5672")
 
 
 # Создаем локальный engine и sessionmaker для работы с локальной БД
 _local_db_url = get_local_database_url()
-_local_engine = create_async_engine(_local_db_url, echo=False, future=True)
+# Параллельно идут пять тестов отправки (см. main), каждый держит одну сессию - их покрывает
+# pool_size; max_overflow оставлен с запасом. Остальные тесты идут последовательно и
+# переиспользуют соединения пула. Класс пула не задаем - для async engine это AsyncAdaptedQueuePool,
+# синхронный QueuePool с асинхронным драйвером несовместим
+_local_engine = create_async_engine(
+    _local_db_url,
+    echo=False,
+    future=True,
+    pool_size=5,
+    max_overflow=5,
+    pool_recycle=1800,
+)
 LocalSessionLocal = async_sessionmaker(_local_engine, expire_on_commit=False, autoflush=False, autocommit=False, class_=AsyncSession)
 
 
+# Тело сообщения фиксированное: {"outbox_id":"<uuid>"}, собираем его без сериализации JSON
+_OUTBOX_PAYLOAD_PREFIX = b'{"outbox_id":"'
+_OUTBOX_PAYLOAD_SUFFIX = b'"}'
+
+
+def _outbox_payload(outbox_id: str) -> bytes:
+    """Тело сообщения для notifier по id записи outbox (UUID в виде строки, экранирование не нужно)."""
+    return _OUTBOX_PAYLOAD_PREFIX + outbox_id.encode("ascii") + _OUTBOX_PAYLOAD_SUFFIX
+
+
 class LocalEmailPublisher:
-    """Локальная версия EmailPublisher для работы с локальным RabbitMQ."""
+    """Локальная версия EmailPublisher для работы с локальным RabbitMQ.
+    
+    Соединение, канал и очередь создаются один раз и переиспользуются всеми публикациями.
+    """
     
     def __init__(self):
         self.rabbitmq_url = get_local_rabbitmq_url()
-        settings = Settings()
-        self.queue_name = settings.rabbitmq_email_queue
+        self.queue_name = get_settings().rabbitmq_email_queue
+        self._connection = None
+        self._channel = None
+        self._lock = asyncio.Lock()
+    
+    async def ensure_started(self) -> None:
+        """Открывает соединение и канал и объявляет очередь при первом вызове."""
+        if self._channel is not None:
+            return
+        async with self._lock:
+            if self._channel is not None:
+                return
+            self._connection = await connect_robust(self.rabbitmq_url)
+            # Подтверждения публикации не ждем: источник истины - строка email_outbox в Postgres,
+            # потерянное сообщение можно переотправить по ней
+            channel = await self._connection.channel(publisher_confirms=False)
+            await channel.declare_queue(self.queue_name, durable=True)
+            self._channel = channel
     
     async def publish_outbox(self, outbox_id: str) -> None:
         """Публикует сообщение в локальную очередь RabbitMQ."""
-        connection = await connect_robust(self.rabbitmq_url)
-        try:
-            channel = await connection.channel()
-            queue = await channel.declare_queue(self.queue_name, durable=True)
-            payload = json.dumps({"outbox_id": outbox_id}).encode()
-            await channel.default_exchange.publish(
-                RabbitMQMessage(payload, delivery_mode=DeliveryMode.PERSISTENT),
-                routing_key=queue.name,
+        await self.ensure_started()
+        await self._channel.default_exchange.publish(
+            RabbitMQMessage(_outbox_payload(outbox_id), delivery_mode=DeliveryMode.NOT_PERSISTENT),
+            routing_key=self.queue_name,
+        )
+    
+    async def publish_outbox_batch(self, outbox_ids: Sequence[str]) -> None:
+        """Публикует пачку сообщений на общем канале, не дожидаясь каждого по очереди."""
+        await self.ensure_started()
+        await asyncio.gather(
+            *(
+                self._channel.default_exchange.publish(
+                    RabbitMQMessage(
+                        _outbox_payload(outbox_id),
+                        delivery_mode=DeliveryMode.NOT_PERSISTENT,
+                    ),
+                    routing_key=self.queue_name,
+                )
+                for outbox_id in outbox_ids
             )
-        finally:
-            await connection.close()
+        )
+    
+    async def aclose(self) -> None:
+        """Закрывает соединение с RabbitMQ."""
+        if self._connection is not None:
+            await self._connection.close()
+        self._connection = None
+        self._channel = None
+
+
+# Один издатель на весь скрипт
+local_publisher = LocalEmailPublisher()
 
 
 class LocalMessageService:
@@ -93,7 +158,7 @@ class LocalMessageService:
         self.session = session
         self.messages = SqlAlchemyMessageRepository(session)
         self.outbox = SqlAlchemyEmailOutboxRepository(session)
-        self.publisher = LocalEmailPublisher()
+        self.publisher = local_publisher
     
     async def create_message(self, sender_id: UUID, subject: str, body: str, recipient_user_ids: list[UUID]):
         """Создает сообщение."""
@@ -117,6 +182,43 @@ class LocalMessageService:
         await self.session.commit()
         await self.publisher.publish_outbox(str(outbox_entry.id))
         return outbox_entry
+    
+    async def enqueue_email_batch(self, entries: Sequence[tuple[UUID, Sequence[str]]]) -> list[UUID]:
+        """Добавляет в очередь отправки несколько писем: одна вставка, один коммит, одна пачка публикаций."""
+        if not entries:
+            return []
+        message_ids = {message_id for message_id, _ in entries}
+        rows = await self.session.execute(
+            select(Message.id, Message.subject, Message.body).where(Message.id.in_(message_ids))
+        )
+        messages = {row.id: row for row in rows}
+        missing = message_ids - messages.keys()
+        if missing:
+            raise ValueError(f"Messages {', '.join(map(str, missing))} not found")
+        
+        outbox_ids = list(
+            await self.session.scalars(
+                insert(EmailOutbox).returning(EmailOutbox.id, sort_by_parameter_order=True),
+                [
+                    {
+                        "message_id": message_id,
+                        "subject": messages[message_id].subject,
+                        "body": messages[message_id].body,
+                    }
+                    for message_id, _ in entries
+                ],
+            )
+        )
+        recipient_rows = [
+            {"outbox_id": outbox_id, "email": email}
+            for outbox_id, (_, recipients_emails) in zip(outbox_ids, entries, strict=True)
+            for email in dict.fromkeys(recipients_emails)
+        ]
+        if recipient_rows:
+            await self.session.execute(insert(EmailOutboxRecipient), recipient_rows)
+        await self.session.commit()
+        await self.publisher.publish_outbox_batch([str(outbox_id) for outbox_id in outbox_ids])
+        return outbox_ids
 
 
 def print_section(title: str):
@@ -132,6 +234,19 @@ def print_step(step_num: int, title: str):
     print("-" * 70)
 
 
+# Внешние адреса демо-данных принадлежат студентам
+_STUDENT_DOMAINS = ("@gmail.com", "@inbox.ru")
+
+
+def _demo_role_for(email: str) -> UserRole:
+    """Роль тестового пользователя по его email."""
+    if "student" in email or email.endswith(_STUDENT_DOMAINS):
+        return UserRole.student
+    if "teacher" in email:
+        return UserRole.teacher
+    return UserRole.guardian
+
+
 async def ensure_users_exist():
     """Убеждается, что все необходимые пользователи существуют."""
     print_step(0, "Проверка и создание тестовых пользователей")
@@ -143,22 +258,42 @@ async def ensure_users_exist():
         {"email": "parent1@demo.com", "full_name": "Ольга Иванова", "password": "demo123"},
     ]
     
+    # bcrypt нагружает CPU, хешируем все пароли параллельно в потоках
+    password_hashes = await asyncio.gather(
+        *(asyncio.to_thread(hash_password, user_data["password"]) for user_data in users_to_create)
+    )
+    
     async with LocalSessionLocal() as session:
-        repo = SqlAlchemyUserRepository(session)
+        # Одна вставка: существующих пользователей Postgres пропускает по уникальному индексу email
+        stmt = (
+            pg_insert(User)
+            .values(
+                [
+                    {
+                        "email": user_data["email"],
+                        "full_name": user_data["full_name"],
+                        "password_hash": password_hash,
+                    }
+                    for user_data, password_hash in zip(users_to_create, password_hashes, strict=True)
+                ]
+            )
+            .on_conflict_do_nothing(index_elements=[User.email])
+            .returning(User.id, User.email)
+        )
+        created = {row.email: row.id for row in await session.execute(stmt)}
+        
+        if created:
+            await session.execute(
+                pg_insert(UserRoleAssignment).on_conflict_do_nothing(),
+                [{"user_id": user_id, "role": _demo_role_for(email)} for email, user_id in created.items()],
+            )
+        await session.commit()
         
         for user_data in users_to_create:
-            existing = await repo.get_by_email(user_data["email"])
-            if existing:
-                print(f"  ✓ Пользователь {user_data['email']} уже существует")
-            else:
-                user = await repo.create_user(
-                    email=user_data["email"],
-                    full_name=user_data["full_name"],
-                    password_hash=hash_password(user_data["password"]),
-                    roles=["student"] if "student" in user_data["email"] or "@gmail" in user_data["email"] or "@inbox" in user_data["email"] else ["teacher"] if "teacher" in user_data["email"] else ["guardian"],
-                )
-                await session.commit()
+            if user_data["email"] in created:
                 print(f"  ✓ Создан пользователь: {user_data['email']}")
+            else:
+                print(f"  ✓ Пользователь {user_data['email']} уже существует")
 
 
 async def get_user_by_email(email: str, session: AsyncSession | None = None) -> User | None:
@@ -172,6 +307,12 @@ async def get_user_by_email(email: str, session: AsyncSession | None = None) ->
             return await repo.get_by_email(email)
 
 
+async def get_users_by_emails(session: AsyncSession, emails: Sequence[str]) -> dict[str, User]:
+    """Получает пользователей по списку email одним запросом."""
+    users = await session.scalars(select(User).where(User.email.in_(emails)))
+    return {user.email: user for user in users}
+
+
 async def get_all_users(session: AsyncSession | None = None) -> list[User]:
     """Получает список всех пользователей."""
     if session is not None:
@@ -197,10 +338,10 @@ async def test_1_single_recipient_email():
     print_step(1, "Отправка email одному получателю")
     
     async with LocalSessionLocal() as session:
-        # Получаем отправителя (админ) и получателя
-        repo = SqlAlchemyUserRepository(session)
-        admin = await repo.get_by_email("admin@test.com")
-        recipient = await repo.get_by_email("student1@demo.com")
+        # Получаем отправителя (админ) и получателя одним запросом
+        users = await get_users_by_emails(session, ["admin@test.com", "student1@demo.com"])
+        admin = users.get("admin@test.com")
+        recipient = users.get("student1@demo.com")
         
         if not admin or not recipient:
             print("  ❌ Не найдены необходимые пользователи")
@@ -232,14 +373,10 @@ async def test_2_multiple_recipients_email():
     print_step(2, "Отправка email нескольким получателям")
     
     async with LocalSessionLocal() as session:
-        repo = SqlAlchemyUserRepository(session)
-        admin = await repo.get_by_email("admin@test.com")
-        recipients = [
-            await repo.get_by_email("student1@demo.com"),
-            await repo.get_by_email("student2@demo.com"),
-            await repo.get_by_email("student3@demo.com"),
-        ]
-        recipients = [r for r in recipients if r is not None]
+        recipient_emails = ["student1@demo.com", "student2@demo.com", "student3@demo.com"]
+        found = await get_users_by_emails(session, ["admin@test.com", *recipient_emails])
+        admin = found.get("admin@test.com")
+        recipients = [found[email] for email in recipient_emails if email in found]
         
         if not admin or not recipients:
             print("  ❌ Не найдены необходимые пользователи")
@@ -268,18 +405,28 @@ async def test_2_multiple_recipients_email():
         print(f"  ✓ Получатели: {', '.join(recipient_emails)}")
 
 
+# Размер пачки при чтении пользователей и число получателей в одной записи outbox
+BROADCAST_BATCH_SIZE = 1000
+
+
 async def test_3_broadcast_email():
     """Тест 3: Массовая рассылка всем пользователям."""
     print_step(3, "Массовая рассылка всем пользователям")
     
     async with LocalSessionLocal() as session:
-        repo = SqlAlchemyUserRepository(session)
-        admin = await repo.get_by_email("admin@test.com")
-        stmt = select(User)
-        result = await session.scalars(stmt)
-        users = list(result.all())
-        
-        if not admin or not users:
+        # Нужны только id и email: читаем их потоком через серверный курсор, без загрузки ORM-объектов
+        stmt = select(User.id, User.email).execution_options(yield_per=BROADCAST_BATCH_SIZE)
+        recipient_ids: list[UUID] = []
+        recipient_emails: list[str] = []
+        # Администратор уже есть среди всех пользователей: находим его в том же проходе
+        admin_id: UUID | None = None
+        async for user_id, email in await session.stream(stmt):
+            recipient_ids.append(user_id)
+            recipient_emails.append(email)
+            if email == "admin@test.com":
+                admin_id = user_id
+        
+        if not admin_id or not recipient_ids:
             print("  ❌ Не найдены необходимые пользователи")
             return
         
@@ -287,7 +434,7 @@ async def test_3_broadcast_email():
         
         # Создаем сообщение
         message = await service.create_message(
-            sender_id=admin.id,
+            sender_id=admin_id,
             subject="Массовая рассылка: Добро пожаловать в EduTrack!",
             body="""Здравствуйте!
 
@@ -297,19 +444,19 @@ async def test_3_broadcast_email():
 
 С уважением,
 Команда EduTrack""",
-            recipient_user_ids=[user.id for user in users],
+            recipient_user_ids=recipient_ids,
         )
         print(f"  ✓ Сообщение создано (ID: {message.id})")
-        print(f"  ✓ Всего пользователей в системе: {len(users)}")
-        
-        # Отправляем email всем пользователям
-        recipient_emails = [user.email for user in users]
-        outbox = await service.enqueue_email(
-            message_id=message.id,
-            recipients_emails=recipient_emails,
+        print(f"  ✓ Всего пользователей в системе: {len(recipient_ids)}")
+        
+        # Отправляем email всем пользователям: одна запись outbox на пачку получателей
+        outbox_ids = await service.enqueue_email_batch(
+            [
+                (message.id, recipient_emails[start:start + BROADCAST_BATCH_SIZE])
+                for start in range(0, len(recipient_emails), BROADCAST_BATCH_SIZE)
+            ]
         )
-        print(f"  ✓ Email добавлен в очередь (Outbox ID: {outbox.id})")
-        print(f"  ✓ Статус: {outbox.status.value}")
+        print(f"  ✓ Email добавлен в очередь (записей outbox: {len(outbox_ids)})")
         print(f"  ✓ Количество получателей: {len(recipient_emails)}")
 
 
@@ -406,37 +553,31 @@ async def test_10_password_reset_confirm():
             print(f"  ❌ Пользователь {test_email} не найден")
             return
         
-        # Запрашиваем восстановление пароля
+        # В БД хранится только хеш токена, поэтому выдаем токен напрямую через репозиторий,
+        # как это делает request_reset (без отправки письма)
         print(f"  📧 Создаем токен для: {test_email}")
-        await service.request_reset(email=test_email)
-        
-        # Получаем токен из базы
         from edutrack.infrastructure.repositories.sqlalchemy import SqlAlchemyPasswordResetTokenRepository
         token_repo = SqlAlchemyPasswordResetTokenRepository(session)
-        from sqlalchemy import select
-        from edutrack.infrastructure.db.models import PasswordResetToken
-        stmt = select(PasswordResetToken).where(
-            PasswordResetToken.user_id == user.id,
-            PasswordResetToken.used == False
-        ).order_by(PasswordResetToken.created_at.desc())
-        token_obj = await session.scalar(stmt)
-        
-        if not token_obj:
-            print(f"  ❌ Токен не найден")
-            return
+        token = secrets.token_urlsafe(32)
+        await token_repo.create_token(
+            user_id=user.id,
+            token_hash=hash_reset_token(token),
+            expires_at=datetime.now(UTC) + timedelta(hours=24),
+        )
+        await session.commit()
         
-        print(f"  ✓ Токен найден: {token_obj.token[:20]}...")
-        print(f"  💡 Для тестирования используйте этот токен или токен из письма")
+        print(f"  ✓ Токен создан: {token[:20]}...")
+        print(f"  💡 Для тестирования используйте этот токен")
         print(f"  💡 Пример использования через API:")
         print(f"     curl -X POST http://127.0.0.1:8000/api/v1/auth/password-reset/confirm \\")
         print(f"       -H 'Content-Type: application/json' \\")
-        print(f"       -d '{{\"token\": \"{token_obj.token}\", \"new_password\": \"newpassword123\"}}'")
+        print(f"       -d '{{\"token\": \"{token}\", \"new_password\": \"newpassword123\"}}'")
         
         # Тестируем восстановление пароля
         new_password = "newpassword123"
         print(f"\n  🔄 Тестируем восстановление пароля...")
         try:
-            await service.reset_password(token=token_obj.token, new_password=new_password)
+            await service.reset_password(token=token, new_password=new_password)
             print(f"  ✓ Пароль успешно изменен!")
             print(f"  💡 Новый пароль: {new_password}")
             print(f"  💡 Теперь можно войти с новым паролем")
@@ -449,28 +590,41 @@ async def test_7_check_outbox_statuses():
     print_step(7, "Проверка статусов записей в outbox")
     
     async with LocalSessionLocal() as session:
-        # Получаем все записи из outbox
-        stmt = select(EmailOutbox).order_by(EmailOutbox.created_at.desc()).limit(10)
-        result = await session.scalars(stmt)
-        outbox_entries = list(result.all())
+        # Статистику по статусам считает Postgres, строки outbox целиком не загружаем
+        counts_stmt = select(EmailOutbox.status, func.count()).group_by(EmailOutbox.status)
+        status_counts = {status.value: count for status, count in (await session.execute(counts_stmt)).all()}
         
-        print(f"  📊 Найдено записей в outbox: {len(outbox_entries)}")
-        
-        status_counts = {}
-        for entry in outbox_entries:
-            status = entry.status.value
-            status_counts[status] = status_counts.get(status, 0) + 1
+        print(f"  📊 Найдено записей в outbox: {sum(status_counts.values())}")
         
         print(f"\n  Статистика по статусам:")
         for status, count in status_counts.items():
             print(f"    - {status}: {count}")
         
+        # Для последних записей берем только выводимые колонки и число получателей
+        recipients_count = (
+            select(func.count())
+            .where(EmailOutboxRecipient.outbox_id == EmailOutbox.id)
+            .correlate(EmailOutbox)
+            .scalar_subquery()
+        )
+        latest_stmt = (
+            select(
+                EmailOutbox.id,
+                EmailOutbox.status,
+                EmailOutbox.subject,
+                EmailOutbox.last_error,
+                recipients_count.label("recipients_count"),
+            )
+            .order_by(EmailOutbox.created_at.desc())
+            .limit(5)
+        )
+        
         # Показываем последние записи
         print(f"\n  Последние записи:")
-        for entry in outbox_entries[:5]:
+        for entry in (await session.execute(latest_stmt)).all():
             print(f"    - ID: {entry.id}")
             print(f"      Статус: {entry.status.value}")
-            print(f"      Получателей: {len(entry.recipients)}")
+            print(f"      Получателей: {entry.recipients_count}")
             print(f"      Тема: {entry.subject[:50]}...")
             if entry.last_error:
                 print(f"      Ошибка: {entry.last_error[:100]}...")
@@ -482,9 +636,9 @@ async def test_8_multiple_messages_same_recipient():
     print_step(8, "Отправка нескольких сообщений одному получателю")
     
     async with LocalSessionLocal() as session:
-        repo = SqlAlchemyUserRepository(session)
-        admin = await repo.get_by_email("admin@test.com")
-        recipient = await repo.get_by_email("student1@demo.com")
+        users = await get_users_by_emails(session, ["admin@test.com", "student1@demo.com"])
+        admin = users.get("admin@test.com")
+        recipient = users.get("student1@demo.com")
         
         if not admin or not recipient:
             print("  ❌ Не найдены необходимые пользователи")
@@ -511,7 +665,7 @@ async def test_8_multiple_messages_same_recipient():
             },
         ]
         
-        outbox_ids = []
+        messages = []
         for msg_data in messages_data:
             message = await service.create_message(
                 sender_id=admin.id,
@@ -519,13 +673,14 @@ async def test_8_multiple_messages_same_recipient():
                 body=msg_data["body"],
                 recipient_user_ids=[recipient.id],
             )
-            
-            outbox = await service.enqueue_email(
-                message_id=message.id,
-                recipients_emails=[recipient.email],
-            )
-            outbox_ids.append(outbox.id)
-            print(f"  ✓ Сообщение '{msg_data['subject']}' добавлено в очередь (Outbox ID: {outbox.id})")
+            messages.append(message)
+        
+        # Все письма ставим в очередь одной пачкой
+        outbox_ids = await service.enqueue_email_batch(
+            [(message.id, [recipient.email]) for message in messages]
+        )
+        for message, outbox_id in zip(messages, outbox_ids, strict=True):
+            print(f"  ✓ Сообщение '{message.subject}' добавлено в очередь (Outbox ID: {outbox_id})")
         
         print(f"\n  ✓ Всего отправлено сообщений: {len(outbox_ids)}")
 
@@ -565,37 +720,25 @@ async def main():
         # Подготовка
         await ensure_users_exist()
         
-        # Тесты отправки email через outbox
-        await test_1_single_recipient_email()
-        await asyncio.sleep(1)  # Небольшая задержка между тестами
-        
-        await test_2_multiple_recipients_email()
-        await asyncio.sleep(1)
-        
-        await test_3_broadcast_email()
-        await asyncio.sleep(1)
-        
-        await test_4_message_without_recipients()
-        await asyncio.sleep(1)
+        # Тесты отправки email через outbox независимы: каждый открывает свою сессию,
+        # а общий у них только канал RabbitMQ, поэтому запускаем их параллельно
+        await asyncio.gather(
+            test_1_single_recipient_email(),
+            test_2_multiple_recipients_email(),
+            test_3_broadcast_email(),
+            test_4_message_without_recipients(),
+            test_8_multiple_messages_same_recipient(),
+        )
         
         # Тесты восстановления пароля
         await test_5_password_reset_email()
-        await asyncio.sleep(1)
-        
         await test_6_password_reset_nonexistent_user()
-        await asyncio.sleep(1)
         
-        # Проверка статусов
+        # Проверка статусов - после всех отправок, так как читает outbox
         await test_7_check_outbox_statuses()
-        await asyncio.sleep(1)
-        
-        # Дополнительные тесты
-        await test_8_multiple_messages_same_recipient()
-        await asyncio.sleep(1)
         
         # Финальная проверка доставки
         await test_9_wait_and_check_delivery()
-        await asyncio.sleep(1)
         
         # Тест подтверждения восстановления пароля
         await test_10_password_reset_confirm()
@@ -606,7 +749,7 @@ async def main():
         print("   - Проверьте логи notifier (если запущен локально)")
         print("   - Проверьте почтовые ящики получателей")
         print("   - Проверьте статусы в таблице email_outbox:")
-        print("     psql -U edutrack -d edutrack -c \"SELECT id, status, recipients, subject, created_at, sent_at FROM email_outbox ORDER BY created_at DESC LIMIT 10;\"")
+        print("     psql -U edutrack -d edutrack -c \"SELECT o.id, o.status, array_agg(r.email) AS recipients, o.subject, o.created_at, o.sent_at FROM email_outbox o LEFT JOIN email_outbox_recipients r ON r.outbox_id = o.id GROUP BY o.id ORDER BY o.created_at DESC LIMIT 10;\"")
         print("\n📝 Примечание:")
         print("   - Для обработки очереди RabbitMQ запустите notifier локально:")
         print("     python -m edutrack.notifier.main")
@@ -616,6 +759,9 @@ async def main():
         import traceback
         traceback.print_exc()
         sys.exit(1)
+    finally:
+        await local_publisher.aclose()
+        await _local_engine.dispose()
 
 
 if __name__ == "__main__":
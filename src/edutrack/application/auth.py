@@ -1,15 +1,35 @@
+import asyncio
+
+from edutrack.infrastructure.cache.redis import get_cache, increment, invalidate
 from edutrack.infrastructure.repositories.sqlalchemy import SqlAlchemyUserRepository
 from edutrack.infrastructure.services.security import create_access_token, verify_password
 from fastapi import HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
+# После стольких неудачных попыток вход по email блокируется до истечения окна
+MAX_FAILED_LOGINS = 10
+FAILED_LOGINS_TTL = 60
+
 
 class AuthService:
     def __init__(self, session: AsyncSession):
         self.users = SqlAlchemyUserRepository(session)
 
+    def _failed_logins_key(self, email: str) -> str:
+        # email хранится как CITEXT, поэтому счетчик тоже не зависит от регистра
+        return f"auth:fail:{email.lower()}"
+
     async def authenticate(self, email: str, password: str) -> str:
+        key = self._failed_logins_key(email)
+        # Перебор паролей отсекаем до запроса в БД и bcrypt
+        failed = await get_cache(key)
+        if failed is not None and failed >= MAX_FAILED_LOGINS:
+            raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too many login attempts")
         user = await self.users.get_by_email(email)
-        if not user or not verify_password(password, user.password_hash):
+        # bcrypt нагружает CPU: проверяем пароль в потоке, чтобы не блокировать event loop
+        if not user or not await asyncio.to_thread(verify_password, password, user.password_hash):
+            await increment(key, ttl_seconds=FAILED_LOGINS_TTL)
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+        if failed:
+            await invalidate(key)
         return create_access_token(str(user.id))
@@ -1,10 +1,17 @@
 from uuid import UUID
 
-from edutrack.infrastructure.cache.redis import get_cache, invalidate, set_cache
+from edutrack.infrastructure.cache.redis import (
+    bump_version,
+    dump_json,
+    get_cache_raw,
+    get_version,
+    set_cache_raw,
+)
 from edutrack.infrastructure.repositories.sqlalchemy import SqlAlchemyClassRepository
 from sqlalchemy.ext.asyncio import AsyncSession
 
 CLASSES_TTL = 600
+CLASSES_CACHE_VERSION = "classes"
 
 
 class ClassService:
@@ -12,24 +19,39 @@ class ClassService:
         self.repo = SqlAlchemyClassRepository(session)
         self.session = session
 
-    def _cache_key(self, school_id: UUID | None) -> str:
-        return f"cache:classes:{school_id or 'all'}"
+    async def _cache_key(self, school_id: UUID | None) -> str | None:
+        """Ключ кеша списка классов; None, если версия недоступна и кеш использовать нельзя."""
+        version = await get_version(CLASSES_CACHE_VERSION)
+        if version is None:
+            return None
+        return f"cache:classes:v{version}:{school_id or 'all'}"
 
     async def create_class(self, school_id: UUID, name: str, grade_level: int):
         class_ = await self.repo.create_class(school_id=school_id, name=name, grade_level=grade_level)
         await self.session.commit()
-        await invalidate(self._cache_key(school_id))
+        # Смена версии устаревает и список школы, и общий список всех классов
+        await bump_version(CLASSES_CACHE_VERSION)
         return class_
 
-    async def list_classes(self, school_id: UUID | None):
-        key = self._cache_key(school_id)
-        cached = await get_cache(key)
-        if cached:
-            return cached
+    async def list_classes(self, school_id: UUID | None) -> bytes:
+        """Список классов в виде готового JSON.
+
+        Из кеша байты возвращаются как есть - без разбора и повторной сериализации,
+        её можно сразу отдать в Response(media_type="application/json").
+        """
+        key = await self._cache_key(school_id)
+        if key:
+            cached = await get_cache_raw(key, local_ttl=CLASSES_TTL)
+            if cached:
+                return cached
+        # Строки читаются прямо из результата запроса и сразу сериализуются
         classes = await self.repo.list_classes(school_id)
-        data = [
-            {"id": str(c.id), "school_id": str(c.school_id), "name": c.name, "grade_level": c.grade_level}
-            for c in classes
-        ]
-        await set_cache(key, data, ttl_seconds=CLASSES_TTL)
+        data = dump_json(
+            [
+                {"id": str(c.id), "school_id": str(c.school_id), "name": c.name, "grade_level": c.grade_level}
+                for c in classes
+            ]
+        )
+        if key:
+            await set_cache_raw(key, data, ttl_seconds=CLASSES_TTL, local_ttl=CLASSES_TTL)
         return data
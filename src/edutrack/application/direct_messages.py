@@ -33,9 +33,9 @@ class DirectMessageService:
 
     async def mark_as_read(self, message_id: UUID, user_id: UUID) -> None:
         """Отметить сообщение как прочитанное."""
-        # Проверяем, что пользователь является получателем
-        # (это можно сделать через получение сообщения, но для простоты пропустим)
-        await self.messages.mark_as_read(message_id)
+        # Получатель проверяется в том же UPDATE, без отдельного чтения сообщения
+        if not await self.messages.mark_as_read(message_id, recipient_id=user_id):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Доступ запрещен")
         await self.session.commit()
 
     async def get_unread_count(self, user_id: UUID) -> int:
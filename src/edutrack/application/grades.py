@@ -1,6 +1,7 @@
 from uuid import UUID
 
-from edutrack.infrastructure.cache.redis import get_cache, invalidate, set_cache
+from edutrack.application.performance import performance_cache_key
+from edutrack.infrastructure.cache.redis import dump_json, get_cache_raw, invalidate, set_cache_raw
 from edutrack.infrastructure.repositories.sqlalchemy import SqlAlchemyGradeRepository
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -18,24 +19,32 @@ class GradeService:
     async def create_grade(self, student_id: UUID, lesson_id: UUID, value: int, comment: str | None):
         grade = await self.repo.create_grade(student_id=student_id, lesson_id=lesson_id, value=value, comment=comment)
         await self.session.commit()
-        await invalidate(self._cache_key(student_id))
+        # Оценки студента и его успеваемость за месяц сбрасываем за один запрос к Redis
+        await invalidate(
+            self._cache_key(student_id),
+            performance_cache_key(student_id, grade.created_at.year, grade.created_at.month),
+        )
         return grade
 
-    async def list_grades(self, student_id: UUID):
+    async def list_grades(self, student_id: UUID) -> bytes:
+        """Оценки студента в виде готового JSON (из кеша отдается как есть)."""
         key = self._cache_key(student_id)
-        cached = await get_cache(key)
+        cached = await get_cache_raw(key)
         if cached:
             return cached
         grades = await self.repo.list_for_student(student_id)
-        data = [
-            {
-                "id": str(g.id),
-                "lesson_id": str(g.lesson_id),
-                "value": g.value,
-                "comment": g.comment,
-                "created_at": g.created_at.isoformat(),
-            }
-            for g in grades
-        ]
-        await set_cache(key, data, ttl_seconds=GRADES_TTL)
+        data = dump_json(
+            [
+                {
+                    "id": str(g.id),
+                    "student_id": str(student_id),
+                    "lesson_id": str(g.lesson_id),
+                    "value": g.value,
+                    "comment": g.comment,
+                    "created_at": g.created_at.isoformat(),
+                }
+                for g in grades
+            ]
+        )
+        await set_cache_raw(key, data, ttl_seconds=GRADES_TTL)
         return data
@@ -1,34 +1,33 @@
-from aio_pika import connect_robust
-from edutrack.config.settings import get_settings
+import asyncio
+
 from edutrack.infrastructure.cache.redis import redis
+from edutrack.infrastructure.queue.publisher import email_publisher
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
+async def _probe_db(session: AsyncSession) -> bool:
+    await session.execute(text("SELECT 1"))
+    return True
+
+
+async def _probe_redis() -> bool:
+    await redis.ping()
+    return True
+
+
+async def _probe_rabbit() -> bool:
+    # Проверяем долгоживущее соединение публикатора: переподключаемся только если оно потеряно
+    await asyncio.wait_for(email_publisher.start(), timeout=2)
+    return email_publisher.is_connected
+
+
 async def check_health(session: AsyncSession):
-    settings = get_settings()
-    db_ok = False
-    redis_ok = False
-    rabbit_ok = False
-
-    try:
-        await session.execute(text("SELECT 1"))
-        db_ok = True
-    except Exception:
-        db_ok = False
-
-    try:
-        await redis.ping()
-        redis_ok = True
-    except Exception:
-        redis_ok = False
-
-    try:
-        conn = await connect_robust(settings.rabbitmq_url, timeout=2)
-        await conn.close()
-        rabbit_ok = True
-    except Exception:
-        rabbit_ok = False
+    # Проверки независимы, поэтому выполняем их параллельно: время ответа - самая медленная из них
+    results = await asyncio.gather(
+        _probe_db(session), _probe_redis(), _probe_rabbit(), return_exceptions=True
+    )
+    db_ok, redis_ok, rabbit_ok = (result is True for result in results)
 
     overall = db_ok and redis_ok and rabbit_ok
     return {"status": "ok" if overall else "degraded", "db": db_ok, "redis": redis_ok, "rabbitmq": rabbit_ok}
@@ -1,7 +1,7 @@
 from datetime import datetime
 from uuid import UUID
 
-from edutrack.infrastructure.cache.redis import get_cache, invalidate, set_cache
+from edutrack.infrastructure.cache.redis import dump_json, get_cache_raw, invalidate, set_cache_raw
 from edutrack.infrastructure.repositories.sqlalchemy import SqlAlchemyLessonRepository
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -37,21 +37,24 @@ class LessonService:
         await invalidate(self._schedule_key(class_id))
         return lesson
 
-    async def list_schedule(self, class_id: UUID):
+    async def list_schedule(self, class_id: UUID) -> bytes:
+        """Расписание класса в виде готового JSON (из кеша отдается как есть)."""
         key = self._schedule_key(class_id)
-        cached = await get_cache(key)
+        cached = await get_cache_raw(key)
         if cached:
             return cached
         lessons = await self.repo.list_for_class(class_id)
-        data = [
-            {
-                "id": str(lesson.id),
-                "topic": lesson.topic,
-                "start_at": lesson.start_at.isoformat(),
-                "end_at": lesson.end_at.isoformat(),
-                "subject_id": str(lesson.subject_id),
-            }
-            for lesson in lessons
-        ]
-        await set_cache(key, data, ttl_seconds=SCHEDULE_TTL)
+        data = dump_json(
+            [
+                {
+                    "id": str(lesson.id),
+                    "topic": lesson.topic,
+                    "start_at": lesson.start_at.isoformat(),
+                    "end_at": lesson.end_at.isoformat(),
+                    "subject_id": str(lesson.subject_id),
+                }
+                for lesson in lessons
+            ]
+        )
+        await set_cache_raw(key, data, ttl_seconds=SCHEDULE_TTL)
         return data
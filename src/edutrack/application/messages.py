@@ -2,7 +2,7 @@ import logging
 from collections.abc import Sequence
 from uuid import UUID
 
-from edutrack.infrastructure.queue.publisher import EmailPublisher
+from edutrack.infrastructure.queue.publisher import email_publisher, outbox_payload
 from edutrack.infrastructure.repositories.sqlalchemy import (
     SqlAlchemyEmailOutboxRepository,
     SqlAlchemyMessageRepository,
@@ -18,7 +18,7 @@ class MessageService:
         self.session = session
         self.messages = SqlAlchemyMessageRepository(session)
         self.outbox = SqlAlchemyEmailOutboxRepository(session)
-        self.publisher = EmailPublisher()
+        self.publisher = email_publisher
 
     async def create_message(self, sender_id: UUID, subject: str, body: str, recipient_user_ids: list[UUID]):
         message = await self.messages.create_message(sender_id=sender_id, subject=subject, body=body)
@@ -31,17 +31,20 @@ class MessageService:
         message = await self.messages.get(message_id)
         if not message:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Message not found")
+        recipients = list(dict.fromkeys(recipients_emails))
         outbox_entry = await self.outbox.enqueue(
             message_id=message_id,
-            recipients=list(recipients_emails),
+            recipients=recipients,
             subject=message.subject,
             body=message.body,
         )
         await self.session.commit()
 
-        # Пытаемся опубликовать в очередь
+        # Пытаемся опубликовать в очередь: письмо уходит вместе с сообщением, воркер не читает outbox
         try:
-            await self.publisher.publish_outbox(str(outbox_entry.id))
+            await self.publisher.publish_outbox(
+                outbox_payload(str(outbox_entry.id), recipients, message.subject, message.body)
+            )
         except Exception as e:
             # Если публикация не удалась, помечаем outbox как failed
             error_msg = f"Ошибка публикации в RabbitMQ: {str(e)}"
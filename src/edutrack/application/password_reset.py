@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import secrets
 from datetime import UTC, datetime, timedelta
@@ -7,7 +8,7 @@ from edutrack.infrastructure.repositories.sqlalchemy import (
     SqlAlchemyPasswordResetTokenRepository,
     SqlAlchemyUserRepository,
 )
-from edutrack.infrastructure.services.security import hash_password
+from edutrack.infrastructure.services.security import hash_password, hash_reset_token
 from fastapi import HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -27,11 +28,11 @@ class PasswordResetService:
             # Не раскрываем, существует ли пользователь
             return
 
-        # Генерируем токен
+        # Генерируем токен: пользователь получает его в письме, в БД хранится только SHA-256
         token = secrets.token_urlsafe(32)
         expires_at = datetime.now(UTC) + timedelta(hours=24)
 
-        await self.tokens.create_token(user_id=user.id, token=token, expires_at=expires_at)
+        await self.tokens.create_token(user_id=user.id, token_hash=hash_reset_token(token), expires_at=expires_at)
         await self.session.commit()
 
         # Отправляем email с токеном
@@ -50,7 +51,7 @@ class PasswordResetService:
 
     async def reset_password(self, token: str, new_password: str) -> None:
         """Сбросить пароль по токену."""
-        reset_token = await self.tokens.get_by_token(token)
+        reset_token = await self.tokens.get_by_token_hash(hash_reset_token(token))
         if not reset_token:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -62,6 +63,6 @@ class PasswordResetService:
         if not user:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Пользователь не найден")
 
-        user.password_hash = hash_password(new_password)
+        user.password_hash = await asyncio.to_thread(hash_password, new_password)
         await self.tokens.mark_as_used(reset_token.id)
         await self.session.commit()
@@ -2,10 +2,19 @@ from calendar import monthrange
 from datetime import UTC, datetime
 from uuid import UUID
 
+from edutrack.infrastructure.cache.redis import get_cache, set_cache
 from edutrack.infrastructure.db.models import Grade
-from sqlalchemy import select
+from sqlalchemy import Float, cast, func, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 from sqlalchemy.ext.asyncio import AsyncSession
 
+PERFORMANCE_TTL = 60  # текущий месяц: оценки еще появляются
+PERFORMANCE_PAST_TTL = 7 * 24 * 3600  # прошедшие месяцы не меняются
+
+
+def performance_cache_key(student_id: UUID, year: int, month: int) -> str:
+    return f"cache:perf:{student_id}:{year}:{month}"
+
 
 class PerformanceService:
     def __init__(self, session: AsyncSession):
@@ -17,52 +26,50 @@ class PerformanceService:
         if month < 1 or month > 12:
             raise ValueError("Месяц должен быть от 1 до 12")
 
+        key = performance_cache_key(student_id, year, month)
+        cached = await get_cache(key)
+        if cached is not None:
+            return cached
+
         # Вычисляем начало и конец месяца
         start_date = datetime(year, month, 1, tzinfo=UTC)
         _, last_day = monthrange(year, month)
         end_date = datetime(year, month, last_day, 23, 59, 59, tzinfo=UTC)
 
-        # Получаем все оценки за месяц
+        # Группируем оценки по предметам на стороне Postgres: количество, среднее и сами оценки.
+        # Среднее округляем и приводим к float8 там же - драйвер отдает готовый float вместо Decimal
         from edutrack.infrastructure.db.models import Lesson, Subject
         stmt = (
-            select(Grade, Lesson, Subject)
-            .join(Lesson, Grade.lesson_id == Lesson.id)
-            .join(Subject, Lesson.subject_id == Subject.id)
+            select(
+                Subject.id,
+                Subject.name,
+                func.count(Grade.value),
+                cast(func.round(func.avg(Grade.value), 2), Float),
+                func.array_agg(aggregate_order_by(Grade.value, Grade.created_at)),
+            )
+            .join(Lesson, Lesson.subject_id == Subject.id)
+            .join(Grade, Grade.lesson_id == Lesson.id)
             .where(
                 Grade.student_id == student_id,
                 Grade.created_at >= start_date,
                 Grade.created_at <= end_date
             )
+            .group_by(Subject.id, Subject.name)
         )
         result = await self.session.execute(stmt)
-        rows = result.all()
-
-        # Группируем по предметам
-        from collections import defaultdict
-        subject_stats = defaultdict(lambda: {"grades": [], "subject_id": None, "subject_name": None})
-
-        for grade, _lesson, subject in rows:
-            subject_id = subject.id
-            subject_name = subject.name
-
-            if subject_stats[subject_id]["subject_id"] is None:
-                subject_stats[subject_id]["subject_id"] = subject_id
-                subject_stats[subject_id]["subject_name"] = subject_name
-
-            subject_stats[subject_id]["grades"].append(grade.value)
-
-        # Формируем результат
-        result = []
-        for _subject_id, stats in subject_stats.items():
-            grades_values = stats["grades"]
-            avg_grade = sum(grades_values) / len(grades_values) if grades_values else None
 
-            result.append({
-                "subject_id": stats["subject_id"],
-                "subject_name": stats["subject_name"],
-                "grade_count": len(grades_values),
-                "average_grade": round(avg_grade, 2) if avg_grade else None,
+        statistics = [
+            {
+                "subject_id": subject_id,
+                "subject_name": subject_name,
+                "grade_count": grade_count,
+                "average_grade": avg_grade,
                 "grades": grades_values,
-            })
+            }
+            for subject_id, subject_name, grade_count, avg_grade, grades_values in result.all()
+        ]
 
-        return result
+        now = datetime.now(UTC)
+        ttl = PERFORMANCE_PAST_TTL if (year, month) < (now.year, now.month) else PERFORMANCE_TTL
+        await set_cache(key, statistics, ttl_seconds=ttl)
+        return statistics
@@ -5,7 +5,7 @@ from edutrack.infrastructure.repositories.sqlalchemy import SqlAlchemyUserReposi
 from fastapi import HTTPException, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import raiseload, selectinload
 
 
 class ProfileService:
@@ -16,7 +16,8 @@ class ProfileService:
     async def get_profile(self, user_id: UUID):
         """Получить профиль пользователя."""
         from edutrack.infrastructure.db.models import User
-        stmt = select(User).where(User.id == user_id).options(selectinload(User.user_profile))
+        # Остальные связи запрещаем: случайное обращение к ним упадет сразу, а не выполнит скрытый lazy load
+        stmt = select(User).where(User.id == user_id).options(selectinload(User.user_profile), raiseload("*"))
         user = await self.session.scalar(stmt)
         if not user:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Пользователь не найден")
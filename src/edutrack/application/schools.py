@@ -1,8 +1,14 @@
-from edutrack.infrastructure.cache.redis import get_cache, invalidate, set_cache
+from edutrack.infrastructure.cache.redis import (
+    bump_version,
+    dump_json,
+    get_cache_raw,
+    get_version,
+    set_cache_raw,
+)
 from edutrack.infrastructure.repositories.sqlalchemy import SqlAlchemySchoolRepository
 from sqlalchemy.ext.asyncio import AsyncSession
 
-SCHOOLS_CACHE_KEY = "cache:schools"
+SCHOOLS_CACHE_VERSION = "schools"
 SCHOOLS_TTL = 600  # 10 минут
 
 
@@ -14,14 +20,21 @@ class SchoolService:
     async def create_school(self, name: str, address: str | None):
         school = await self.repo.create_school(name=name, address=address)
         await self.session.commit()
-        await invalidate(SCHOOLS_CACHE_KEY)
+        await bump_version(SCHOOLS_CACHE_VERSION)
         return school
 
-    async def list_schools(self):
-        cached = await get_cache(SCHOOLS_CACHE_KEY)
-        if cached:
-            return cached
+    async def list_schools(self) -> bytes:
+        """Список школ в виде готового JSON (из кеша отдается как есть)."""
+        # Версия в ключе: запись новой школы меняет версию, старый список просто истекает по TTL.
+        # Без версии (Redis недоступен) кеш не используем
+        version = await get_version(SCHOOLS_CACHE_VERSION)
+        key = None if version is None else f"cache:schools:v{version}"
+        if key:
+            cached = await get_cache_raw(key, local_ttl=SCHOOLS_TTL)
+            if cached:
+                return cached
         schools = await self.repo.list_schools()
-        data = [{"id": str(s.id), "name": s.name, "address": s.address} for s in schools]
-        await set_cache(SCHOOLS_CACHE_KEY, data, ttl_seconds=SCHOOLS_TTL)
+        data = dump_json([{"id": str(s.id), "name": s.name, "address": s.address} for s in schools])
+        if key:
+            await set_cache_raw(key, data, ttl_seconds=SCHOOLS_TTL, local_ttl=SCHOOLS_TTL)
         return data
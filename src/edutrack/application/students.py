@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from uuid import UUID
 
@@ -26,23 +27,17 @@ class StudentService:
         school_id: UUID,
         class_id: UUID | None = None,
     ):
-        user = await self.users.create_user(
-            email=email, full_name=full_name, password_hash=hash_password(password), roles=["student"]
+        # URL аватара строится локально из имени (без сетевых запросов),
+        # поэтому профиль создается вместе с пользователем, без отдельного upsert
+        user = self.users.build_user(
+            email=email,
+            full_name=full_name,
+            password_hash=await asyncio.to_thread(hash_password, password),
+            roles=["student"],
+            avatar_url=generate_avatar_url(name=full_name, size=200),
         )
-
-        # Генерируем аватар из имени пользователя
-        try:
-            avatar_url = generate_avatar_url(name=full_name, size=200)
-            # Создаем профиль с аватаром
-            await self.users.update_profile(user_id=user.id, avatar_url=avatar_url)
-            logger.info(f"Аватар сгенерирован для пользователя {user.id}")
-        except Exception as e:
-            # Не блокируем создание пользователя, если аватар не удалось сгенерировать
-            logger.warning(f"Не удалось сгенерировать аватар для пользователя {user.id}: {e}")
-
-        student = await self.students.create_student(user_id=user.id, school_id=school_id)
-        if class_id:
-            await self.students.assign_to_class(student_id=student.id, class_id=class_id)
+        # Пользователь, роль, профиль, студент и привязка к классу сохраняются одним flush
+        student = await self.students.create_for_user(user, school_id=school_id, class_id=class_id)
         await self.session.commit()
         return student
 
@@ -1,9 +1,15 @@
-from edutrack.infrastructure.cache.redis import get_cache, invalidate, set_cache
+from edutrack.infrastructure.cache.redis import (
+    bump_version,
+    dump_json,
+    get_cache_raw,
+    get_version,
+    set_cache_raw,
+)
 from edutrack.infrastructure.db import models
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-SUBJECTS_CACHE_KEY = "cache:subjects"
+SUBJECTS_CACHE_VERSION = "subjects"
 SUBJECTS_TTL = 600
 
 
@@ -15,15 +21,20 @@ class SubjectService:
         subject = models.Subject(name=name)
         self.session.add(subject)
         await self.session.commit()
-        await invalidate(SUBJECTS_CACHE_KEY)
+        await bump_version(SUBJECTS_CACHE_VERSION)
         return subject
 
-    async def list_subjects(self):
-        cached = await get_cache(SUBJECTS_CACHE_KEY)
-        if cached:
-            return cached
+    async def list_subjects(self) -> bytes:
+        """Список предметов в виде готового JSON (из кеша отдается как есть)."""
+        # Без версии (Redis недоступен) кеш не используем
+        version = await get_version(SUBJECTS_CACHE_VERSION)
+        key = None if version is None else f"cache:subjects:v{version}"
+        if key:
+            cached = await get_cache_raw(key, local_ttl=SUBJECTS_TTL)
+            if cached:
+                return cached
         result = await self.session.scalars(select(models.Subject).order_by(models.Subject.name))
-        subjects = result.all()
-        data = [{"id": str(s.id), "name": s.name} for s in subjects]
-        await set_cache(SUBJECTS_CACHE_KEY, data, ttl_seconds=SUBJECTS_TTL)
+        data = dump_json([{"id": str(s.id), "name": s.name} for s in result])
+        if key:
+            await set_cache_raw(key, data, ttl_seconds=SUBJECTS_TTL, local_ttl=SUBJECTS_TTL)
         return data
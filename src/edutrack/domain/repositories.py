@@ -5,6 +5,8 @@ from uuid import UUID
 
 
 class UserRepository(ABC):
+    __slots__ = ()
+
     @abstractmethod
     async def get_by_email(self, email: str) -> Any | None:
         raise NotImplementedError
@@ -14,7 +16,25 @@ class UserRepository(ABC):
         raise NotImplementedError
 
     @abstractmethod
-    async def create_user(self, email: str, full_name: str, password_hash: str, roles: list[str] | None = None) -> Any:
+    def build_user(
+        self,
+        email: str,
+        full_name: str,
+        password_hash: str,
+        roles: list[str] | None = None,
+        avatar_url: str | None = None,
+    ) -> Any:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def create_user(
+        self,
+        email: str,
+        full_name: str,
+        password_hash: str,
+        roles: list[str] | None = None,
+        avatar_url: str | None = None,
+    ) -> Any:
         raise NotImplementedError
 
     @abstractmethod
@@ -31,6 +51,8 @@ class UserRepository(ABC):
 
 
 class SchoolRepository(ABC):
+    __slots__ = ()
+
     @abstractmethod
     async def create_school(self, name: str, address: str | None) -> Any:
         raise NotImplementedError
@@ -41,6 +63,8 @@ class SchoolRepository(ABC):
 
 
 class ClassRepository(ABC):
+    __slots__ = ()
+
     @abstractmethod
     async def create_class(self, school_id: UUID, name: str, grade_level: int) -> Any:
         raise NotImplementedError
@@ -51,10 +75,16 @@ class ClassRepository(ABC):
 
 
 class StudentRepository(ABC):
+    __slots__ = ()
+
     @abstractmethod
     async def create_student(self, user_id: UUID, school_id: UUID) -> Any:
         raise NotImplementedError
 
+    @abstractmethod
+    async def create_for_user(self, user: Any, school_id: UUID, class_id: UUID | None = None) -> Any:
+        raise NotImplementedError
+
     @abstractmethod
     async def assign_to_class(self, student_id: UUID, class_id: UUID) -> Any:
         raise NotImplementedError
@@ -65,6 +95,8 @@ class StudentRepository(ABC):
 
 
 class LessonRepository(ABC):
+    __slots__ = ()
+
     @abstractmethod
     async def create_lesson(self, class_id: UUID, subject_id: UUID, teacher_id: UUID, topic: str, start_at, end_at) -> Any:
         raise NotImplementedError
@@ -75,6 +107,8 @@ class LessonRepository(ABC):
 
 
 class GradeRepository(ABC):
+    __slots__ = ()
+
     @abstractmethod
     async def create_grade(self, student_id: UUID, lesson_id: UUID, value: int, comment: str | None) -> Any:
         raise NotImplementedError
@@ -84,7 +118,17 @@ class GradeRepository(ABC):
         raise NotImplementedError
 
 
+class AttendanceRepository(ABC):
+    __slots__ = ()
+
+    @abstractmethod
+    async def upsert_for_lesson(self, lesson_id: UUID, statuses: dict[UUID, str]) -> None:
+        raise NotImplementedError
+
+
 class MessageRepository(ABC):
+    __slots__ = ()
+
     @abstractmethod
     async def create_message(self, sender_id: UUID, subject: str, body: str) -> Any:
         raise NotImplementedError
@@ -99,6 +143,8 @@ class MessageRepository(ABC):
 
 
 class EmailOutboxRepository(ABC):
+    __slots__ = ()
+
     @abstractmethod
     async def enqueue(self, message_id: UUID, recipients: list[str], subject: str, body: str) -> Any:
         raise NotImplementedError
@@ -117,12 +163,14 @@ class EmailOutboxRepository(ABC):
 
 
 class PasswordResetTokenRepository(ABC):
+    __slots__ = ()
+
     @abstractmethod
-    async def create_token(self, user_id: UUID, token: str, expires_at: Any) -> Any:
+    async def create_token(self, user_id: UUID, token_hash: bytes, expires_at: Any) -> Any:
         raise NotImplementedError
 
     @abstractmethod
-    async def get_by_token(self, token: str) -> Any | None:
+    async def get_by_token_hash(self, token_hash: bytes) -> Any | None:
         raise NotImplementedError
 
     @abstractmethod
@@ -131,6 +179,8 @@ class PasswordResetTokenRepository(ABC):
 
 
 class DirectMessageRepository(ABC):
+    __slots__ = ()
+
     @abstractmethod
     async def create_message(self, sender_id: UUID, recipient_id: UUID, content: str) -> Any:
         raise NotImplementedError
@@ -140,7 +190,7 @@ class DirectMessageRepository(ABC):
         raise NotImplementedError
 
     @abstractmethod
-    async def mark_as_read(self, message_id: UUID) -> None:
+    async def mark_as_read(self, message_id: UUID, recipient_id: UUID) -> bool:
         raise NotImplementedError
 
     @abstractmethod
@@ -149,6 +199,8 @@ class DirectMessageRepository(ABC):
 
 
 class NewsRepository(ABC):
+    __slots__ = ()
+
     @abstractmethod
     async def create_news(self, school_id: UUID, author_id: UUID, title: str, content: str, preview_image_url: str | None = None, published_at: Any | None = None) -> Any:
         raise NotImplementedError
@@ -163,6 +215,8 @@ class NewsRepository(ABC):
 
 
 class InterimAssessmentRepository(ABC):
+    __slots__ = ()
+
     @abstractmethod
     async def create_assessment(self, student_id: UUID, subject_id: UUID, school_year: int, semester: int, grade: int, comment: str | None = None) -> Any:
         raise NotImplementedError
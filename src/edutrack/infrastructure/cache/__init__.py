@@ -1 +1,14 @@
-from .redis import get_cache, invalidate, redis, set_cache  # noqa: F401
+from .redis import (  # noqa: F401
+    bump_version,
+    dump_json,
+    get_cache,
+    get_cache_many,
+    get_cache_raw,
+    get_version,
+    increment,
+    invalidate,
+    redis,
+    set_cache,
+    set_cache_many,
+    set_cache_raw,
+)
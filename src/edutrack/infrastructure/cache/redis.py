@@ -1,62 +1,339 @@
-import json
 import logging
+import socket
+import zlib
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+from time import monotonic
 from typing import Any
 
+import orjson
 from redis.asyncio import ConnectionPool, Redis
 from redis.exceptions import ConnectionError, RedisError
+from redis.utils import HIREDIS_AVAILABLE
 
 from edutrack.config.settings import get_settings
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
-# Используем connection pool для лучшей производительности
-pool = ConnectionPool.from_url(settings.redis_url, decode_responses=True, max_connections=10)
+# Keepalive быстро обнаруживает оборванные соединения пула (TCP_NODELAY asyncio ставит сам)
+_KEEPALIVE_OPTIONS = (
+    {socket.TCP_KEEPIDLE: 30, socket.TCP_KEEPINTVL: 10, socket.TCP_KEEPCNT: 3}
+    if hasattr(socket, "TCP_KEEPIDLE")
+    else {}
+)
+
+# Используем connection pool для лучшей производительности.
+# Ответы не декодируем: в кеше лежит готовый JSON, и байты отдаются клиенту как есть.
+# Ответы разбирает hiredis (extra redis[hiredis]); RESP3 включается через REDIS_PROTOCOL=3
+pool = ConnectionPool.from_url(
+    settings.redis_url,
+    decode_responses=False,
+    protocol=settings.redis_protocol,
+    max_connections=settings.redis_pool_size,
+    socket_keepalive=True,
+    socket_keepalive_options=_KEEPALIVE_OPTIONS,
+    health_check_interval=30,
+    # Кеш не должен задерживать запрос: недоступный Redis дает ошибку за секунду, а не висит
+    socket_connect_timeout=1,
+    socket_timeout=1,
+)
 redis = Redis(connection_pool=pool)
 
 
-async def get_cache(key: str) -> Any | None:
-    """Получить значение из кеша. Возвращает None при ошибках (graceful degradation)."""
+class _CircuitBreaker:
+    """Размыкатель цепи для Redis.
+
+    После failure_threshold ошибок за window секунд обращения к Redis пропускаются
+    на cooldown секунд: при отказе кеша запросы сразу идут мимо него, не дожидаясь таймаутов.
+    """
+
+    def __init__(self, failure_threshold: int = 5, window: float = 10, cooldown: float = 30):
+        self.failure_threshold = failure_threshold
+        self.window = window
+        self.cooldown = cooldown
+        self.failures = 0
+        self.first_failure_at = 0.0
+        self.open_until = 0.0
+
+    @property
+    def is_open(self) -> bool:
+        return monotonic() < self.open_until
+
+    def record_success(self) -> None:
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        now = monotonic()
+        if now - self.first_failure_at > self.window:
+            self.failures = 0
+            self.first_failure_at = now
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            self.failures = 0
+            self.open_until = now + self.cooldown
+            logger.warning("Redis недоступен: обращения к кешу приостановлены на %s секунд", self.cooldown)
+
+
+_breaker = _CircuitBreaker()
+
+# orjson сразу пишет компактный UTF-8 и сам сериализует UUID и datetime (ISO 8601, как в ответах API);
+# default=str остается запасным вариантом для прочих типов (Decimal)
+_JSON_OPTIONS = orjson.OPT_NAIVE_UTC
+
+
+# Крупные значения (списки сущностей) храним сжатыми: JSON сжимается в несколько раз,
+# а zlib на первом уровне обходится дешевле передачи и хранения лишних байт.
+# Сжатый поток начинается с байта 0x78 ("x"), с которого не может начинаться JSON,
+# поэтому старые несжатые записи читаются без изменений
+COMPRESS_THRESHOLD = 1024
+_ZLIB_MAGIC = b"\x78"
+
+
+# Локальный LRU-кеш процесса перед Redis для горячих ключей (списки справочников, версии).
+# Используется только там, где вызывающий код передает local_ttl: значения по версионным
+# ключам неизменяемы, а версии кешируются ненадолго - другие процессы увидят смену версии
+# не позже чем через VERSION_LOCAL_TTL секунд
+LOCAL_CACHE_SIZE = 1024
+VERSION_LOCAL_TTL = 5
+_local: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+
+
+def _local_get(key: str) -> bytes | None:
+    entry = _local.get(key)
+    if entry is None:
+        return None
+    expires_at, value = entry
+    if expires_at <= monotonic():
+        del _local[key]
+        return None
+    _local.move_to_end(key)
+    return value
+
+
+def _local_set(key: str, value: bytes, ttl_seconds: float) -> None:
+    _local[key] = (monotonic() + ttl_seconds, value)
+    _local.move_to_end(key)
+    if len(_local) > LOCAL_CACHE_SIZE:
+        _local.popitem(last=False)
+
+
+def check_accelerators() -> None:
+    """Проверить при старте, что ответы Redis разбирает hiredis.
+
+    Без него redis-py молча переходит на парсер на Python - такой деплой должен падать сразу.
+    """
+    if not HIREDIS_AVAILABLE:
+        raise RuntimeError("hiredis не установлен: поставьте зависимости из poetry.lock (redis[hiredis])")
+
+
+def dump_json(value: Any) -> bytes:
+    """Сериализовать значение для кеша."""
+    return orjson.dumps(value, default=str, option=_JSON_OPTIONS)
+
+
+def _pack(value: bytes) -> bytes:
+    if len(value) < COMPRESS_THRESHOLD:
+        return value
+    return zlib.compress(value, 1)
+
+
+def _unpack(key: str, raw: bytes) -> bytes | None:
+    if not raw.startswith(_ZLIB_MAGIC):
+        return raw
+    try:
+        return zlib.decompress(raw)
+    except zlib.error as e:
+        logger.warning("Ошибка распаковки значения из кеша для ключа %s: %s.", key, e)
+        return None
+
+
+async def get_cache_raw(key: str, local_ttl: float = 0) -> bytes | None:
+    """Получить значение из кеша как есть, без разбора JSON. Возвращает None при ошибках (graceful degradation).
+
+    С local_ttl значение сначала ищется в памяти процесса и сохраняется туда на local_ttl секунд.
+    """
+    if local_ttl:
+        value = _local_get(key)
+        if value is not None:
+            return value
+    if _breaker.is_open:
+        return None
     try:
         raw = await redis.get(key)
-        if raw is None:
-            return None
-        try:
-            return json.loads(raw)
-        except (json.JSONDecodeError, TypeError) as e:
-            logger.warning(f"Ошибка декодирования JSON из кеша для ключа {key}: {e}. Удаляем поврежденный ключ.")
-            # Удаляем поврежденный ключ
-            try:
-                await redis.delete(key)
-            except Exception:
-                pass
-            return None
+        _breaker.record_success()
+        value = None if raw is None else _unpack(key, raw)
+        if value is not None and local_ttl:
+            _local_set(key, value, local_ttl)
+        return value
     except (ConnectionError, RedisError) as e:
-        logger.warning(f"Redis недоступен при получении ключа {key}: {e}. Продолжаем без кеша.")
+        _breaker.record_failure()
+        logger.warning("Redis недоступен при получении ключа %s: %s. Продолжаем без кеша.", key, e)
         return None
     except Exception as e:
-        logger.error(f"Неожиданная ошибка Redis при получении ключа {key}: {e}", exc_info=True)
+        logger.error("Неожиданная ошибка Redis при получении ключа %s: %s", key, e, exc_info=True)
+        return None
+
+
+async def get_cache(key: str) -> Any | None:
+    """Получить значение из кеша. Возвращает None при ошибках (graceful degradation)."""
+    raw = await get_cache_raw(key)
+    if raw is None:
         return None
+    try:
+        return orjson.loads(raw)
+    except (orjson.JSONDecodeError, TypeError) as e:
+        logger.warning("Ошибка декодирования JSON из кеша для ключа %s: %s. Удаляем поврежденный ключ.", key, e)
+        # Удаляем поврежденный ключ
+        await invalidate(key)
+        return None
+
+
+def _loads(key: str, raw: bytes) -> Any | None:
+    data = _unpack(key, raw)
+    if data is None:
+        return None
+    try:
+        return orjson.loads(data)
+    except (orjson.JSONDecodeError, TypeError) as e:
+        logger.warning("Ошибка декодирования JSON из кеша для ключа %s: %s.", key, e)
+        return None
+
+
+async def get_cache_many(keys: Sequence[str]) -> list[Any | None]:
+    """Получить несколько значений одним MGET; для отсутствующих и битых ключей - None."""
+    if not keys:
+        return []
+    if _breaker.is_open:
+        return [None] * len(keys)
+    try:
+        raws = await redis.mget(keys)
+        _breaker.record_success()
+    except (ConnectionError, RedisError) as e:
+        _breaker.record_failure()
+        logger.warning("Redis недоступен при получении %s ключей: %s. Продолжаем без кеша.", len(keys), e)
+        return [None] * len(keys)
+    except Exception as e:
+        logger.error("Неожиданная ошибка Redis при получении %s ключей: %s", len(keys), e, exc_info=True)
+        return [None] * len(keys)
+    return [None if raw is None else _loads(key, raw) for key, raw in zip(keys, raws, strict=True)]
+
+
+async def set_cache_many(values: Mapping[str, Any], ttl_seconds: int) -> None:
+    """Установить несколько значений одним пайплайном (без транзакции). Игнорирует ошибки."""
+    if not values or _breaker.is_open:
+        return
+    try:
+        async with redis.pipeline(transaction=False) as pipe:
+            for key, value in values.items():
+                pipe.set(key, _pack(dump_json(value)), ex=ttl_seconds)
+            await pipe.execute()
+        _breaker.record_success()
+    except (ConnectionError, RedisError) as e:
+        _breaker.record_failure()
+        logger.warning("Redis недоступен при установке %s ключей: %s. Продолжаем без кеша.", len(values), e)
+    except Exception as e:
+        logger.error("Неожиданная ошибка Redis при установке %s ключей: %s", len(values), e, exc_info=True)
+
+
+async def set_cache_raw(key: str, value: bytes, ttl_seconds: int, local_ttl: float = 0) -> None:
+    """Установить уже сериализованное значение в кеш. Игнорирует ошибки (graceful degradation)."""
+    if local_ttl:
+        _local_set(key, value, local_ttl)
+    if _breaker.is_open:
+        return
+    try:
+        await redis.set(key, _pack(value), ex=ttl_seconds)
+        _breaker.record_success()
+    except (ConnectionError, RedisError) as e:
+        _breaker.record_failure()
+        logger.warning("Redis недоступен при установке ключа %s: %s. Продолжаем без кеша.", key, e)
+    except Exception as e:
+        logger.error("Неожиданная ошибка Redis при установке ключа %s: %s", key, e, exc_info=True)
 
 
 async def set_cache(key: str, value: Any, ttl_seconds: int) -> None:
     """Установить значение в кеш. Игнорирует ошибки (graceful degradation)."""
+    await set_cache_raw(key, dump_json(value), ttl_seconds)
+
+
+async def get_version(name: str) -> str | None:
+    """Текущая версия кеша сущности (часть ключа).
+
+    Возвращает None, если Redis недоступен: без версии кеш (и локальный тоже) не используется,
+    иначе после несостоявшегося bump_version читались бы устаревшие записи.
+    """
+    key = f"ver:{name}"
+    value = _local_get(key)
+    if value is not None:
+        return value.decode()
+    if _breaker.is_open:
+        return None
+    try:
+        value = await redis.get(key) or b"0"
+        _breaker.record_success()
+    except (ConnectionError, RedisError) as e:
+        _breaker.record_failure()
+        logger.warning("Redis недоступен при получении версии %s: %s. Продолжаем без кеша.", name, e)
+        return None
+    except Exception as e:
+        logger.error("Неожиданная ошибка Redis при получении версии %s: %s", name, e, exc_info=True)
+        return None
+    _local_set(key, value, VERSION_LOCAL_TTL)
+    return value.decode()
+
+
+async def bump_version(name: str) -> None:
+    """Сменить версию кеша сущности: записи со старой версией больше не читаются и истекают по TTL."""
+    _local.pop(f"ver:{name}", None)
+    if _breaker.is_open:
+        # Версия не сменится: локальные копии по текущей версии устарели, сбрасываем их все
+        _local.clear()
+        return
+    try:
+        await redis.incr(f"ver:{name}")
+        _breaker.record_success()
+        return
+    except (ConnectionError, RedisError) as e:
+        _breaker.record_failure()
+        logger.warning("Redis недоступен при смене версии %s: %s. Продолжаем без кеша.", name, e)
+    except Exception as e:
+        logger.error("Неожиданная ошибка Redis при смене версии %s: %s", name, e, exc_info=True)
+    _local.clear()
+
+
+async def increment(key: str, ttl_seconds: int) -> int | None:
+    """Атомарно увеличить счетчик; TTL ставится при создании ключа. Возвращает None при ошибках."""
+    if _breaker.is_open:
+        return None
     try:
-        await redis.set(key, json.dumps(value, default=str), ex=ttl_seconds)
+        async with redis.pipeline(transaction=True) as pipe:
+            value, _ = await pipe.incr(key).expire(key, ttl_seconds, nx=True).execute()
+        _breaker.record_success()
+        return value
     except (ConnectionError, RedisError) as e:
-        logger.warning(f"Redis недоступен при установке ключа {key}: {e}. Продолжаем без кеша.")
+        _breaker.record_failure()
+        logger.warning("Redis недоступен при увеличении счетчика %s: %s. Продолжаем без кеша.", key, e)
+        return None
     except Exception as e:
-        logger.error(f"Неожиданная ошибка Redis при установке ключа {key}: {e}", exc_info=True)
+        logger.error("Неожиданная ошибка Redis при увеличении счетчика %s: %s", key, e, exc_info=True)
+        return None
 
 
-async def invalidate(key: str) -> None:
-    """Удалить ключ из кеша. Игнорирует ошибки (graceful degradation)."""
+async def invalidate(*keys: str) -> None:
+    """Удалить ключи из кеша одной командой DEL. Игнорирует ошибки (graceful degradation)."""
+    for key in keys:
+        _local.pop(key, None)
+    if _breaker.is_open:
+        return
     try:
-        await redis.delete(key)
+        await redis.delete(*keys)
+        _breaker.record_success()
     except (ConnectionError, RedisError) as e:
-        logger.warning(f"Redis недоступен при удалении ключа {key}: {e}. Продолжаем без кеша.")
+        _breaker.record_failure()
+        logger.warning("Redis недоступен при удалении ключей %s: %s. Продолжаем без кеша.", keys, e)
     except Exception as e:
-        logger.error(f"Неожиданная ошибка Redis при удалении ключа {key}: {e}", exc_info=True)
+        logger.error("Неожиданная ошибка Redis при удалении ключей %s: %s", keys, e, exc_info=True)
 
 
 async def close_redis() -> None:
@@ -66,4 +343,4 @@ async def close_redis() -> None:
         await pool.aclose()
         logger.info("Redis соединения закрыты")
     except Exception as e:
-        logger.error(f"Ошибка при закрытии Redis соединений: {e}", exc_info=True)
+        logger.error("Ошибка при закрытии Redis соединений: %s", e, exc_info=True)
@@ -1,5 +1,6 @@
 import uuid
 
+from sqlalchemy import text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
@@ -10,5 +11,11 @@ class Base(DeclarativeBase):
 
 
 class UUIDMixin:
-    """Mixin для добавления UUID первичного ключа."""
-    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    """Mixin для добавления UUID первичного ключа.
+
+    Значение генерирует БД (gen_uuid_v7(), см. миграцию 0006): ключи упорядочены
+    по времени, поэтому вставки не разбрасываются по всему индексу.
+    """
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), primary_key=True, server_default=text("gen_uuid_v7()")
+    )
@@ -1,14 +1,39 @@
+import asyncio
 from collections.abc import AsyncGenerator
+from contextlib import AsyncExitStack
 
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from edutrack.config.settings import get_settings
 
 settings = get_settings()
-engine = create_async_engine(settings.database_url, echo=settings.debug, future=True)
+# Для async-движка по умолчанию используется AsyncAdaptedQueuePool: задаем только его размеры.
+# pre_ping отсеивает соединения, разорванные сервером, recycle - закрывает слишком старые.
+# Кеши подготовленных выражений (asyncpg и адаптера SQLAlchemy) держат разобранные запросы
+# на соединении, чтобы повторяющиеся выборки репозиториев не готовились заново
+engine = create_async_engine(
+    settings.database_url,
+    echo=settings.debug,
+    future=True,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_pre_ping=True,
+    pool_recycle=settings.db_pool_recycle,
+    connect_args={
+        "statement_cache_size": settings.db_statement_cache_size,
+        "prepared_statement_cache_size": settings.db_statement_cache_size,
+    },
+)
 SessionLocal = async_sessionmaker(engine, expire_on_commit=False, autoflush=False, autocommit=False, class_=AsyncSession)
 
 
+async def warm_up_pool(connections: int = settings.db_pool_size) -> None:
+    """Заранее открыть соединения пула, чтобы первые запросы не ждали подключения к БД."""
+    async with AsyncExitStack() as stack:
+        # Соединения держим одновременно, иначе пул выдаст одно и то же
+        await asyncio.gather(*(stack.enter_async_context(engine.connect()) for _ in range(connections)))
+
+
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     async with SessionLocal() as session:
         yield session
@@ -9,11 +9,14 @@ from sqlalchemy import (
     Enum,
     ForeignKey,
     Integer,
+    LargeBinary,
     String,
     Text,
     UniqueConstraint,
+    func,
 )
-from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.dialects.postgresql import CITEXT, UUID
+from sqlalchemy.ext.associationproxy import AssociationProxy, association_proxy
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base, UUIDMixin
@@ -64,7 +67,9 @@ class UserRoleAssignment(Base):
 
     user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
     role: Mapped[UserRole] = mapped_column(Enum(UserRole, name="userrole_new", create_type=False), primary_key=True)
-    assigned_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False)
+    # Время создания строк здесь и ниже проставляет БД (DEFAULT now() есть во всех миграциях):
+    # значение возвращается тем же INSERT ... RETURNING, без параметра из Python
+    assigned_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     assigned_by: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)
 
     user = relationship("User", foreign_keys=[user_id], back_populates="role_assignments")
@@ -78,7 +83,7 @@ class UserProfile(Base):
     date_of_birth: Mapped[date | None] = mapped_column(Date, nullable=True)
     show_birthday: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
     avatar_url: Mapped[str | None] = mapped_column(String(500), nullable=True)
-    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=lambda: datetime.now(UTC), nullable=False)
 
     user = relationship("User", back_populates="user_profile")
 
@@ -86,10 +91,10 @@ class UserProfile(Base):
 class User(Base, UUIDMixin):
     __tablename__ = "users"
 
-    email: Mapped[str] = mapped_column(String(255), unique=True, nullable=False)
+    email: Mapped[str] = mapped_column(CITEXT, unique=True, nullable=False)
     full_name: Mapped[str] = mapped_column(String(255), nullable=False)
     password_hash: Mapped[str] = mapped_column(String(255), nullable=False)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     role_assignments = relationship(
         "UserRoleAssignment",
@@ -101,8 +106,8 @@ class User(Base, UUIDMixin):
     teacher_profile = relationship("Teacher", back_populates="user", uselist=False)
     guardian_profile = relationship("Guardian", back_populates="user", uselist=False)
     user_profile = relationship("UserProfile", back_populates="user", uselist=False, cascade="all, delete-orphan")
-    sent_direct_messages = relationship("DirectMessage", foreign_keys="DirectMessage.sender_id", back_populates="sender")
-    received_direct_messages = relationship("DirectMessage", foreign_keys="DirectMessage.recipient_id", back_populates="recipient")
+    sent_direct_messages = relationship("DirectMessage", foreign_keys="DirectMessage.sender_id", back_populates="sender", lazy="raise_on_sql")
+    received_direct_messages = relationship("DirectMessage", foreign_keys="DirectMessage.recipient_id", back_populates="recipient", lazy="raise_on_sql")
     password_reset_tokens = relationship("PasswordResetToken", back_populates="user", cascade="all, delete-orphan")
 
 
@@ -111,11 +116,13 @@ class School(Base, UUIDMixin):
 
     name: Mapped[str] = mapped_column(String(255), nullable=False)
     address: Mapped[str | None] = mapped_column(String(255))
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
-    classes = relationship("Class", back_populates="school")
-    students = relationship("Student", back_populates="school")
-    news = relationship("News", back_populates="school")
+    # Большие коллекции не подгружаются неявно: забытый selectinload в запросе
+    # падает сразу, а не превращается в N+1 (в async-сессии ленивая загрузка все равно невозможна)
+    classes = relationship("Class", back_populates="school", lazy="raise_on_sql")
+    students = relationship("Student", back_populates="school", lazy="raise_on_sql")
+    news = relationship("News", back_populates="school", lazy="raise_on_sql")
 
 
 class Class(Base, UUIDMixin):
@@ -124,12 +131,12 @@ class Class(Base, UUIDMixin):
     school_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("schools.id"), nullable=False)
     name: Mapped[str] = mapped_column(String(50), nullable=False)
     grade_level: Mapped[int] = mapped_column(Integer, nullable=False)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     school = relationship("School", back_populates="classes")
-    students = relationship("ClassStudent", back_populates="class_")
+    students = relationship("ClassStudent", back_populates="class_", lazy="raise_on_sql")
     subjects = relationship("ClassSubject", back_populates="class_")
-    lessons = relationship("Lesson", back_populates="class_")
+    lessons = relationship("Lesson", back_populates="class_", lazy="raise_on_sql")
 
     __table_args__ = (UniqueConstraint("school_id", "name", name="uq_class_school_name"),)
 
@@ -139,15 +146,15 @@ class Student(Base, UUIDMixin):
 
     user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, unique=True)
     school_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("schools.id"), nullable=False)
-    enrolled_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False)
+    enrolled_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     user = relationship("User", back_populates="student_profile")
     school = relationship("School", back_populates="students")
     classes = relationship("ClassStudent", back_populates="student")
-    grades = relationship("Grade", back_populates="student")
-    attendance = relationship("Attendance", back_populates="student")
-    submissions = relationship("HomeworkSubmission", back_populates="student")
-    interim_assessments = relationship("InterimAssessment", back_populates="student")
+    grades = relationship("Grade", back_populates="student", lazy="raise_on_sql")
+    attendance = relationship("Attendance", back_populates="student", lazy="raise_on_sql")
+    submissions = relationship("HomeworkSubmission", back_populates="student", lazy="raise_on_sql")
+    interim_assessments = relationship("InterimAssessment", back_populates="student", lazy="raise_on_sql")
 
 
 class Teacher(Base, UUIDMixin):
@@ -155,12 +162,12 @@ class Teacher(Base, UUIDMixin):
 
     user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, unique=True)
     school_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("schools.id"), nullable=False)
-    hired_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False)
+    hired_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     user = relationship("User", back_populates="teacher_profile")
     school = relationship("School")
     subjects = relationship("ClassSubject", back_populates="teacher")
-    lessons = relationship("Lesson", back_populates="teacher")
+    lessons = relationship("Lesson", back_populates="teacher", lazy="raise_on_sql")
 
 
 class Guardian(Base, UUIDMixin):
@@ -193,10 +200,10 @@ class Subject(Base, UUIDMixin):
     __tablename__ = "subjects"
 
     name: Mapped[str] = mapped_column(String(255), unique=True, nullable=False)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     class_subjects = relationship("ClassSubject", back_populates="subject")
-    lessons = relationship("Lesson", back_populates="subject")
+    lessons = relationship("Lesson", back_populates="subject", lazy="raise_on_sql")
 
 
 class ClassSubject(Base):
@@ -223,8 +230,8 @@ class Lesson(Base, UUIDMixin):
     class_ = relationship("Class", back_populates="lessons")
     subject = relationship("Subject", back_populates="lessons")
     teacher = relationship("Teacher", back_populates="lessons")
-    grades = relationship("Grade", back_populates="lesson")
-    attendance = relationship("Attendance", back_populates="lesson")
+    grades = relationship("Grade", back_populates="lesson", lazy="raise_on_sql")
+    attendance = relationship("Attendance", back_populates="lesson", lazy="raise_on_sql")
     homework = relationship("Homework", back_populates="lesson", uselist=False)
 
 
@@ -235,7 +242,7 @@ class Grade(Base, UUIDMixin):
     lesson_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("lessons.id"), nullable=False)
     value: Mapped[int] = mapped_column(Integer, nullable=False)
     comment: Mapped[str | None] = mapped_column(Text)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     student = relationship("Student", back_populates="grades")
     lesson = relationship("Lesson", back_populates="grades")
@@ -243,11 +250,12 @@ class Grade(Base, UUIDMixin):
 
 class Attendance(Base, UUIDMixin):
     __tablename__ = "attendance"
+    __table_args__ = (UniqueConstraint("lesson_id", "student_id", name="uq_attendance_lesson_student"),)
 
     student_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("students.id"), nullable=False)
     lesson_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("lessons.id"), nullable=False)
     status: Mapped[AttendanceStatus] = mapped_column(Enum(AttendanceStatus), nullable=False)
-    noted_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False)
+    noted_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     student = relationship("Student", back_populates="attendance")
     lesson = relationship("Lesson", back_populates="attendance")
@@ -261,7 +269,7 @@ class Homework(Base, UUIDMixin):
     due_date: Mapped[date] = mapped_column(Date, nullable=False)
 
     lesson = relationship("Lesson", back_populates="homework")
-    submissions = relationship("HomeworkSubmission", back_populates="homework")
+    submissions = relationship("HomeworkSubmission", back_populates="homework", lazy="raise_on_sql")
 
 
 class HomeworkSubmission(Base, UUIDMixin):
@@ -270,7 +278,7 @@ class HomeworkSubmission(Base, UUIDMixin):
     homework_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("homeworks.id"), nullable=False)
     student_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("students.id"), nullable=False)
     content: Mapped[str] = mapped_column(Text, nullable=False)
-    submitted_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False)
+    submitted_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     grade: Mapped[int | None] = mapped_column(Integer)
 
     homework = relationship("Homework", back_populates="submissions")
@@ -285,11 +293,11 @@ class Message(Base, UUIDMixin):
     sender_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     subject: Mapped[str] = mapped_column(String(255), nullable=False)
     body: Mapped[str] = mapped_column(Text, nullable=False)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     sender = relationship("User")
-    recipients = relationship("MessageRecipient", back_populates="message")
-    outbox_entries = relationship("EmailOutbox", back_populates="message")
+    recipients = relationship("MessageRecipient", back_populates="message", lazy="raise_on_sql")
+    outbox_entries = relationship("EmailOutbox", back_populates="message", lazy="raise_on_sql")
 
 
 class MessageRecipient(Base):
@@ -307,7 +315,6 @@ class EmailOutbox(Base, UUIDMixin):
     __tablename__ = "email_outbox"
 
     message_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("messages.id"), nullable=False)
-    recipients: Mapped[list[str]] = mapped_column(JSONB, nullable=False)
     subject: Mapped[str] = mapped_column(String(255), nullable=False)
     body: Mapped[str] = mapped_column(Text, nullable=False)
     status: Mapped[MessageDeliveryStatus] = mapped_column(
@@ -315,10 +322,26 @@ class EmailOutbox(Base, UUIDMixin):
     )
     retries: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
     last_error: Mapped[str | None] = mapped_column(Text)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     sent_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
 
     message = relationship("Message", back_populates="outbox_entries")
+    # Получатели хранятся в отдельной таблице, чтобы строки очереди оставались узкими
+    recipient_entries = relationship(
+        "EmailOutboxRecipient", cascade="all, delete-orphan", passive_deletes=True, lazy="selectin"
+    )
+    recipients: AssociationProxy[list[str]] = association_proxy(
+        "recipient_entries", "email", creator=lambda email: EmailOutboxRecipient(email=email)
+    )
+
+
+class EmailOutboxRecipient(Base):
+    __tablename__ = "email_outbox_recipients"
+
+    outbox_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("email_outbox.id", ondelete="CASCADE"), primary_key=True
+    )
+    email: Mapped[str] = mapped_column(Text, primary_key=True)
 
 
 class PasswordResetToken(Base, UUIDMixin):
@@ -326,10 +349,10 @@ class PasswordResetToken(Base, UUIDMixin):
     __tablename__ = "password_reset_tokens"
 
     user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, unique=True)
-    token: Mapped[str] = mapped_column(String(255), unique=True, nullable=False)
+    token_hash: Mapped[bytes] = mapped_column(LargeBinary(32), unique=True, nullable=False)  # SHA-256 токена
     expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
     used: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     user = relationship("User", back_populates="password_reset_tokens")
 
@@ -342,7 +365,7 @@ class DirectMessage(Base, UUIDMixin):
     recipient_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     content: Mapped[str] = mapped_column(Text, nullable=False)
     read: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     sender = relationship("User", foreign_keys=[sender_id], back_populates="sent_direct_messages")
     recipient = relationship("User", foreign_keys=[recipient_id], back_populates="received_direct_messages")
@@ -358,7 +381,7 @@ class News(Base, UUIDMixin):
     content: Mapped[str] = mapped_column(Text, nullable=False)
     preview_image_url: Mapped[str | None] = mapped_column(String(500), nullable=True)
     published_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)  # None = черновик, будущее время = запланировано
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     school = relationship("School", back_populates="news")
     author = relationship("User")
@@ -374,7 +397,7 @@ class InterimAssessment(Base, UUIDMixin):
     semester: Mapped[int] = mapped_column(Integer, nullable=False)  # Семестр (1 или 2)
     grade: Mapped[int] = mapped_column(Integer, nullable=False)  # Оценка за аттестацию
     comment: Mapped[str | None] = mapped_column(Text, nullable=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     student = relationship("Student", back_populates="interim_assessments")
     subject = relationship("Subject")
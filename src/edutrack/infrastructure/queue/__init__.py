@@ -1 +1,6 @@
-from .publisher import EmailPublisher  # noqa: F401
+from .publisher import (  # noqa: F401
+    BatchingEmailPublisher,
+    EmailPublisher,
+    email_publisher,
+    outbox_payload,
+)
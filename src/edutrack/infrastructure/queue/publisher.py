@@ -1,6 +1,8 @@
 import asyncio
 import json
 import logging
+from collections.abc import Sequence
+from typing import Any
 
 from aio_pika import DeliveryMode, Message, connect_robust
 from aio_pika.abc import AbstractChannel, AbstractConnection
@@ -9,6 +11,20 @@ from edutrack.config.settings import get_settings
 
 logger = logging.getLogger(__name__)
 
+# Письма больше этого размера воркер читает из outbox, чтобы не раздувать сообщения в очереди
+MAX_INLINE_BODY = 64 * 1024
+
+
+def outbox_payload(outbox_id: str, recipients: Sequence[str], subject: str, body: str) -> dict[str, Any]:
+    """Сообщение для очереди: письмо целиком, если оно небольшое, иначе только ссылка на запись outbox.
+
+    С письмом внутри воркеру не нужно читать outbox из Postgres - запись обновляется только статусом.
+    """
+    payload: dict[str, Any] = {"outbox_id": outbox_id}
+    if len(body) <= MAX_INLINE_BODY:
+        payload.update(recipients=list(recipients), subject=subject, body=body)
+    return payload
+
 
 class EmailPublisher:
     """Публикатор сообщений в RabbitMQ с переиспользованием соединений."""
@@ -18,19 +34,16 @@ class EmailPublisher:
         self._connection: AbstractConnection | None = None
         self._channel: AbstractChannel | None = None
         self._lock = asyncio.Lock()
-        self._queue_name: str | None = None
 
     async def _ensure_connection(self) -> None:
         """Обеспечить наличие активного соединения и канала."""
-        if self._connection and not self._connection.is_closed:
-            if self._channel and not self._channel.is_closed:
-                return
+        if self.is_connected:
+            return
 
         async with self._lock:
             # Двойная проверка после получения блокировки
-            if self._connection and not self._connection.is_closed:
-                if self._channel and not self._channel.is_closed:
-                    return
+            if self.is_connected:
+                return
 
             # Закрываем старые соединения, если они есть
             if self._channel and not self._channel.is_closed:
@@ -48,13 +61,14 @@ class EmailPublisher:
             # Создаем новое соединение
             try:
                 self._connection = await connect_robust(self.settings.rabbitmq_url)
+                # Подтверждения брокера обязательны: повторной отправки из outbox нет, и без них
+                # потерянное сообщение оставило бы запись в pending навсегда
                 self._channel = await self._connection.channel()
-                # Объявляем очередь один раз
-                queue = await self._channel.declare_queue(
+                # Объявляем очередь один раз на соединение, дальше публикуем по имени без Queue.Declare
+                await self._channel.declare_queue(
                     self.settings.rabbitmq_email_queue,
                     durable=True
                 )
-                self._queue_name = queue.name
                 logger.info("RabbitMQ соединение установлено")
             except Exception as e:
                 logger.error(f"Ошибка при установке соединения с RabbitMQ: {e}", exc_info=True)
@@ -62,22 +76,47 @@ class EmailPublisher:
                 self._channel = None
                 raise
 
-    async def publish_outbox(self, outbox_id: str) -> None:
+    @property
+    def is_connected(self) -> bool:
+        """Есть ли открытое соединение и канал."""
+        return bool(
+            self._connection and not self._connection.is_closed
+            and self._channel and not self._channel.is_closed
+        )
+
+    async def start(self) -> None:
+        """Открыть соединение и объявить очередь заранее (при старте приложения)."""
+        await self._ensure_connection()
+
+    async def publish_outbox(self, payload: dict[str, Any]) -> None:
         """Опубликовать сообщение в очередь."""
+        await self.publish_outbox_batch([payload])
+
+    async def publish_outbox_batch(self, payloads: Sequence[dict[str, Any]]) -> None:
+        """Опубликовать пачку сообщений: публикации идут параллельно, подтверждения ждем вместе."""
         try:
             await self._ensure_connection()
 
             if not self._channel or self._channel.is_closed:
                 raise ConnectionError("Канал RabbitMQ недоступен")
 
-            payload = json.dumps({"outbox_id": outbox_id}).encode()
-            await self._channel.default_exchange.publish(
-                Message(payload, delivery_mode=DeliveryMode.PERSISTENT),
-                routing_key=self._queue_name or self.settings.rabbitmq_email_queue,
+            await asyncio.gather(
+                *(
+                    self._channel.default_exchange.publish(
+                        Message(
+                            json.dumps(payload, ensure_ascii=False).encode(),
+                            content_type="application/json",
+                            delivery_mode=DeliveryMode.PERSISTENT,
+                        ),
+                        routing_key=self.settings.rabbitmq_email_queue,
+                    )
+                    for payload in payloads
+                )
             )
-            logger.debug(f"Сообщение опубликовано в очередь: {outbox_id}")
+            logger.debug(f"Сообщения опубликованы в очередь: {len(payloads)}")
         except Exception as e:
-            logger.error(f"Ошибка при публикации сообщения {outbox_id} в RabbitMQ: {e}", exc_info=True)
+            outbox_ids = [payload["outbox_id"] for payload in payloads]
+            logger.error(f"Ошибка при публикации сообщений {outbox_ids} в RabbitMQ: {e}", exc_info=True)
             # Сбрасываем соединение при ошибке для переподключения
             if self._channel:
                 try:
@@ -111,3 +150,97 @@ class EmailPublisher:
                 except Exception as e:
                     logger.warning(f"Ошибка при закрытии соединения: {e}")
                 self._connection = None
+
+
+class BatchingEmailPublisher:
+    """Публикатор, который собирает одновременные публикации в пачки.
+
+    publish_outbox ставит сообщение в очередь и ждет результата; фоновая задача забирает до max_batch
+    сообщений (или сколько накопится за max_linger секунд) и публикует их одной пачкой.
+    Подтверждения брокера пачка ждет один раз, а не на каждое сообщение по отдельности -
+    ради этого и стоит задержка до max_linger.
+    """
+
+    def __init__(self, publisher: EmailPublisher, max_batch: int = 64, max_linger: float = 0.01):
+        self._publisher = publisher
+        self.max_batch = max_batch
+        self.max_linger = max_linger
+        self._queue: asyncio.Queue[tuple[dict[str, Any], asyncio.Future[None]]] = asyncio.Queue()
+        self._worker: asyncio.Task[None] | None = None
+        # Пачка, которую фоновая задача собирает или публикует прямо сейчас
+        self._batch: list[tuple[dict[str, Any], asyncio.Future[None]]] = []
+
+    @property
+    def is_connected(self) -> bool:
+        return self._publisher.is_connected
+
+    async def start(self) -> None:
+        """Открыть соединение и запустить фоновую задачу."""
+        await self._publisher.start()
+        self._ensure_worker()
+
+    async def publish_outbox(self, payload: dict[str, Any]) -> None:
+        """Опубликовать сообщение в очередь (в составе ближайшей пачки)."""
+        self._ensure_worker()
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        await self._queue.put((payload, future))
+        await future
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    async def _collect_batch(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._batch.append(await self._queue.get())
+        deadline = loop.time() + self.max_linger
+        while len(self._batch) < self.max_batch:
+            if not self._queue.empty():
+                self._batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                self._batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except TimeoutError:
+                break
+
+    def _resolve_batch(self, error: BaseException | None = None) -> None:
+        for _, future in self._batch:
+            if future.done():
+                continue
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(error)
+        self._batch = []
+
+    async def _run(self) -> None:
+        while True:
+            await self._collect_batch()
+            try:
+                await self._publisher.publish_outbox_batch([payload for payload, _ in self._batch])
+            except Exception as e:
+                self._resolve_batch(e)
+            else:
+                self._resolve_batch()
+
+    async def close(self) -> None:
+        """Остановить фоновую задачу и закрыть соединения (для graceful shutdown)."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        # Ожидающие публикации завершаем ошибкой: записи outbox останутся для повторной отправки
+        while not self._queue.empty():
+            self._batch.append(self._queue.get_nowait())
+        self._resolve_batch(ConnectionError("Публикатор RabbitMQ остановлен"))
+        await self._publisher.close()
+
+
+# Общий публикатор процесса: соединение и канал живут все время работы приложения
+email_publisher = BatchingEmailPublisher(EmailPublisher())
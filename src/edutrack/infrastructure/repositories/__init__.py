@@ -1,4 +1,5 @@
 from .sqlalchemy import (  # noqa: F401
+    SqlAlchemyAttendanceRepository,
     SqlAlchemyClassRepository,
     SqlAlchemyEmailOutboxRepository,
     SqlAlchemyGradeRepository,
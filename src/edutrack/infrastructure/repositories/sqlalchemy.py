@@ -2,10 +2,13 @@ from collections.abc import Iterable
 from datetime import UTC, date, datetime
 from uuid import UUID
 
-from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy import and_, delete, func, insert, lambda_stmt, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, raiseload
 
 from edutrack.domain.repositories import (
+    AttendanceRepository,
     ClassRepository,
     DirectMessageRepository,
     EmailOutboxRepository,
@@ -24,6 +27,8 @@ from edutrack.infrastructure.db.models import UserRole, UserRoleAssignment
 
 
 class SqlAlchemyUserRepository(UserRepository):
+    __slots__ = ("session",)
+
     def __init__(self, session: AsyncSession):
         self.session = session
 
@@ -35,24 +40,49 @@ class SqlAlchemyUserRepository(UserRepository):
         stmt = select(models.User).where(models.User.id == user_id)
         return await self.session.scalar(stmt)
 
-    async def create_user(
-        self, email: str, full_name: str, password_hash: str, roles: list[str] | None = None
+    def build_user(
+        self,
+        email: str,
+        full_name: str,
+        password_hash: str,
+        roles: list[str] | None = None,
+        avatar_url: str | None = None,
     ) -> models.User:
+        """Добавить пользователя с ролями и профилем в сессию без flush.
+
+        Связанные записи привязаны через relationship: id пользователя генерирует БД,
+        и SQLAlchemy подставит его во все INSERT при первом же flush.
+        """
         user = models.User(email=email, full_name=full_name, password_hash=password_hash)
-        self.session.add(user)
-        await self.session.flush()
+
+        # Профиль нового пользователя создаем сразу, без проверки существующего
+        if avatar_url is not None:
+            user.user_profile = models.UserProfile(avatar_url=avatar_url)
 
         # Назначаем роли, если указаны
         if roles:
             for role_str in roles:
                 try:
                     role = UserRole(role_str)
-                    role_assignment = UserRoleAssignment(user_id=user.id, role=role)
-                    self.session.add(role_assignment)
+                    user.role_assignments.append(UserRoleAssignment(role=role))
                 except ValueError:
                     # Игнорируем невалидные роли
                     pass
 
+        self.session.add(user)
+        return user
+
+    async def create_user(
+        self,
+        email: str,
+        full_name: str,
+        password_hash: str,
+        roles: list[str] | None = None,
+        avatar_url: str | None = None,
+    ) -> models.User:
+        user = self.build_user(
+            email=email, full_name=full_name, password_hash=password_hash, roles=roles, avatar_url=avatar_url
+        )
         await self.session.flush()
         return user
 
@@ -110,6 +140,8 @@ class SqlAlchemyUserRepository(UserRepository):
 
 
 class SqlAlchemySchoolRepository(SchoolRepository):
+    __slots__ = ("session",)
+
     def __init__(self, session: AsyncSession):
         self.session = session
 
@@ -126,6 +158,8 @@ class SqlAlchemySchoolRepository(SchoolRepository):
 
 
 class SqlAlchemyClassRepository(ClassRepository):
+    __slots__ = ("session",)
+
     def __init__(self, session: AsyncSession):
         self.session = session
 
@@ -136,15 +170,20 @@ class SqlAlchemyClassRepository(ClassRepository):
         return class_
 
     async def list_classes(self, school_id: UUID | None = None):
-        stmt = select(models.Class)
+        # Список нужен только для выдачи: читаем колонки строками, без создания ORM-объектов
+        stmt = lambda_stmt(
+            lambda: select(models.Class.id, models.Class.school_id, models.Class.name, models.Class.grade_level)
+        )
         if school_id:
-            stmt = stmt.where(models.Class.school_id == school_id)
-        stmt = stmt.order_by(models.Class.grade_level, models.Class.name)
-        result = await self.session.scalars(stmt)
-        return result.all()
+            stmt += lambda s: s.where(models.Class.school_id == school_id)
+        stmt += lambda s: s.order_by(models.Class.grade_level, models.Class.name)
+        # Отдаем результат без промежуточного списка: вызывающий код читает его один раз
+        return await self.session.execute(stmt)
 
 
 class SqlAlchemyStudentRepository(StudentRepository):
+    __slots__ = ("session",)
+
     def __init__(self, session: AsyncSession):
         self.session = session
 
@@ -154,6 +193,15 @@ class SqlAlchemyStudentRepository(StudentRepository):
         await self.session.flush()
         return student
 
+    async def create_for_user(self, user: models.User, school_id: UUID, class_id: UUID | None = None) -> models.Student:
+        """Создать студента для еще не сохраненного пользователя: все записи уходят одним flush."""
+        student = models.Student(user=user, school_id=school_id)
+        self.session.add(student)
+        if class_id:
+            self.session.add(models.ClassStudent(student=student, class_id=class_id))
+        await self.session.flush()
+        return student
+
     async def assign_to_class(self, student_id: UUID, class_id: UUID) -> models.ClassStudent:
         link = models.ClassStudent(student_id=student_id, class_id=class_id)
         self.session.add(link)
@@ -166,6 +214,8 @@ class SqlAlchemyStudentRepository(StudentRepository):
 
 
 class SqlAlchemyLessonRepository(LessonRepository):
+    __slots__ = ("session",)
+
     def __init__(self, session: AsyncSession):
         self.session = session
 
@@ -189,6 +239,8 @@ class SqlAlchemyLessonRepository(LessonRepository):
 
 
 class SqlAlchemyGradeRepository(GradeRepository):
+    __slots__ = ("session",)
+
     def __init__(self, session: AsyncSession):
         self.session = session
 
@@ -208,7 +260,33 @@ class SqlAlchemyGradeRepository(GradeRepository):
         return result.all()
 
 
+class SqlAlchemyAttendanceRepository(AttendanceRepository):
+    __slots__ = ("session",)
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def upsert_for_lesson(self, lesson_id: UUID, statuses: dict[UUID, str]) -> None:
+        """Отмечает посещаемость урока для всех переданных учеников одним запросом."""
+        if not statuses:
+            return
+        stmt = pg_insert(models.Attendance).values(
+            [
+                {"lesson_id": lesson_id, "student_id": student_id, "status": models.AttendanceStatus(status)}
+                for student_id, status in statuses.items()
+            ]
+        )
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_attendance_lesson_student",
+            set_={"status": stmt.excluded.status, "noted_at": func.now()},
+        )
+        await self.session.execute(stmt)
+        await self.session.flush()
+
+
 class SqlAlchemyMessageRepository(MessageRepository):
+    __slots__ = ("session",)
+
     def __init__(self, session: AsyncSession):
         self.session = session
 
@@ -219,9 +297,15 @@ class SqlAlchemyMessageRepository(MessageRepository):
         return message
 
     async def add_recipients(self, message_id: UUID, recipients: list[UUID]):
-        for recipient_id in recipients:
-            self.session.add(models.MessageRecipient(message_id=message_id, recipient_user_id=recipient_id))
-        await self.session.flush()
+        # Один многострочный INSERT без создания ORM-объектов; получатель - часть первичного ключа,
+        # поэтому дубликаты убираем с сохранением порядка
+        await self.session.execute(
+            insert(models.MessageRecipient),
+            [
+                {"message_id": message_id, "recipient_user_id": recipient_id}
+                for recipient_id in dict.fromkeys(recipients)
+            ],
+        )
 
     async def get(self, message_id: UUID) -> models.Message | None:
         stmt = select(models.Message).where(models.Message.id == message_id)
@@ -229,13 +313,16 @@ class SqlAlchemyMessageRepository(MessageRepository):
 
 
 class SqlAlchemyEmailOutboxRepository(EmailOutboxRepository):
+    __slots__ = ("session",)
+
     def __init__(self, session: AsyncSession):
         self.session = session
 
     async def enqueue(self, message_id: UUID, recipients: list[str], subject: str, body: str) -> models.EmailOutbox:
         outbox = models.EmailOutbox(
             message_id=message_id,
-            recipients=recipients,
+            # email - часть первичного ключа получателя, дубликаты убираем с сохранением порядка
+            recipients=list(dict.fromkeys(recipients)),
             subject=subject,
             body=body,
         )
@@ -269,22 +356,24 @@ class SqlAlchemyEmailOutboxRepository(EmailOutboxRepository):
 
 
 class SqlAlchemyPasswordResetTokenRepository(PasswordResetTokenRepository):
+    __slots__ = ("session",)
+
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def create_token(self, user_id: UUID, token: str, expires_at: datetime) -> models.PasswordResetToken:
+    async def create_token(self, user_id: UUID, token_hash: bytes, expires_at: datetime) -> models.PasswordResetToken:
         # Удаляем старые токены для этого пользователя
         delete_stmt = delete(models.PasswordResetToken).where(models.PasswordResetToken.user_id == user_id)
         await self.session.execute(delete_stmt)
 
-        reset_token = models.PasswordResetToken(user_id=user_id, token=token, expires_at=expires_at)
+        reset_token = models.PasswordResetToken(user_id=user_id, token_hash=token_hash, expires_at=expires_at)
         self.session.add(reset_token)
         await self.session.flush()
         return reset_token
 
-    async def get_by_token(self, token: str) -> models.PasswordResetToken | None:
+    async def get_by_token_hash(self, token_hash: bytes) -> models.PasswordResetToken | None:
         stmt = select(models.PasswordResetToken).where(
-            models.PasswordResetToken.token == token,
+            models.PasswordResetToken.token_hash == token_hash,
             ~models.PasswordResetToken.used,
             models.PasswordResetToken.expires_at > datetime.now(UTC)
         )
@@ -297,6 +386,8 @@ class SqlAlchemyPasswordResetTokenRepository(PasswordResetTokenRepository):
 
 
 class SqlAlchemyDirectMessageRepository(DirectMessageRepository):
+    __slots__ = ("session",)
+
     def __init__(self, session: AsyncSession):
         self.session = session
 
@@ -321,10 +412,15 @@ class SqlAlchemyDirectMessageRepository(DirectMessageRepository):
         result = await self.session.scalars(stmt)
         return result.all()
 
-    async def mark_as_read(self, message_id: UUID) -> None:
-        stmt = update(models.DirectMessage).where(models.DirectMessage.id == message_id).values(read=True)
-        await self.session.execute(stmt)
-        await self.session.flush()
+    async def mark_as_read(self, message_id: UUID, recipient_id: UUID) -> bool:
+        """Отметить сообщение прочитанным; False, если сообщения нет или пользователь не его получатель."""
+        stmt = (
+            update(models.DirectMessage)
+            .where(models.DirectMessage.id == message_id, models.DirectMessage.recipient_id == recipient_id)
+            .values(read=True)
+            .returning(models.DirectMessage.id)
+        )
+        return await self.session.scalar(stmt) is not None
 
     async def get_unread_count(self, user_id: UUID) -> int:
         stmt = select(func.count(models.DirectMessage.id)).where(
@@ -336,6 +432,8 @@ class SqlAlchemyDirectMessageRepository(DirectMessageRepository):
 
 
 class SqlAlchemyNewsRepository(NewsRepository):
+    __slots__ = ("session",)
+
     def __init__(self, session: AsyncSession):
         self.session = session
 
@@ -369,11 +467,18 @@ class SqlAlchemyNewsRepository(NewsRepository):
         return result.all()
 
     async def get_by_id(self, news_id: UUID) -> models.News | None:
-        stmt = select(models.News).where(models.News.id == news_id)
+        # Автор нужен для ответа - грузим его тем же запросом, прочие связи запрещаем
+        stmt = (
+            select(models.News)
+            .where(models.News.id == news_id)
+            .options(joinedload(models.News.author), raiseload("*"))
+        )
         return await self.session.scalar(stmt)
 
 
 class SqlAlchemyInterimAssessmentRepository(InterimAssessmentRepository):
+    __slots__ = ("session",)
+
     def __init__(self, session: AsyncSession):
         self.session = session
 
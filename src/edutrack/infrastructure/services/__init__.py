@@ -1 +1,6 @@
-from .security import create_access_token, hash_password, verify_password  # noqa: F401
+from .security import (  # noqa: F401
+    create_access_token,
+    hash_password,
+    hash_reset_token,
+    verify_password,
+)
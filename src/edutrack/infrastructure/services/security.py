@@ -1,3 +1,4 @@
+import hashlib
 from datetime import UTC, datetime, timedelta
 
 import bcrypt
@@ -23,6 +24,14 @@ def hash_password(password: str) -> str:
     return hashed.decode("utf-8")
 
 
+def hash_reset_token(token: str) -> bytes:
+    """SHA-256 токена сброса пароля: в БД хранится только хеш.
+
+    Токен приходит от клиента как есть, поэтому кодируем в UTF-8: любая строка просто не найдется.
+    """
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+
 def create_access_token(subject: str) -> str:
     expire = datetime.now(UTC) + timedelta(minutes=settings.jwt_exp_minutes)
     payload = {"sub": subject, "exp": expire}
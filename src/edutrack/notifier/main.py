@@ -11,6 +11,12 @@ from edutrack.infrastructure.db.database import SessionLocal, engine
 from edutrack.infrastructure.email.sender import send_email
 from edutrack.infrastructure.repositories.sqlalchemy import SqlAlchemyEmailOutboxRepository
 
+try:
+    # uvloop - зависимость проекта (кроме Windows); API получает его через uvicorn (--loop auto)
+    import uvloop
+except ImportError:  # pragma: no cover - например, Windows
+    uvloop = None
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("edutrack.notifier")
 settings = get_settings()
@@ -38,16 +44,21 @@ async def process_message(message: IncomingMessage, max_retries: int = 3):
 
             async with SessionLocal() as session:
                 repo = SqlAlchemyEmailOutboxRepository(session)
-                entry = await repo.get_pending(outbox_id)
-                if not entry:
-                    logger.warning("Outbox entry %s not found", outbox_id)
-                    return
+                if "body" in data:
+                    # Письмо пришло в сообщении целиком - запись outbox не читаем, только обновляем статус
+                    recipients, subject, body = data["recipients"], data["subject"], data["body"]
+                else:
+                    entry = await repo.get_pending(outbox_id)
+                    if not entry:
+                        logger.warning("Outbox entry %s not found", outbox_id)
+                        return
+                    recipients, subject, body = entry.recipients, entry.subject, entry.body
 
                 # Retry логика для отправки email
                 for attempt in range(1, max_retries + 1):
                     try:
-                        await send_email(entry.recipients, entry.subject, entry.body)
-                        await repo.mark_sent(entry.id)
+                        await send_email(recipients, subject, body)
+                        await repo.mark_sent(outbox_id)
                         await session.commit()
                         logger.info("Email sent for outbox %s (attempt %d)", outbox_id, attempt)
                         return
@@ -70,7 +81,7 @@ async def process_message(message: IncomingMessage, max_retries: int = 3):
                                 str(exc),
                                 exc_info=True,
                             )
-                            await repo.mark_failed(entry.id, str(exc))
+                            await repo.mark_failed(outbox_id, str(exc))
                             await session.commit()
                             # Не поднимаем исключение, чтобы сообщение не вернулось в очередь
     except Exception as exc:
@@ -191,6 +202,9 @@ async def main():
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        if uvloop is not None:
+            uvloop.run(main())
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
         logger.info("Notifier остановлен")
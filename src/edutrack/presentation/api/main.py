@@ -12,9 +12,10 @@ from starlette.middleware.base import BaseHTTPMiddleware
 
 from edutrack.application.health import check_health
 from edutrack.config.settings import get_settings
-from edutrack.infrastructure.cache.redis import close_redis
-from edutrack.infrastructure.db.database import engine, get_session
+from edutrack.infrastructure.cache.redis import check_accelerators, close_redis
+from edutrack.infrastructure.db.database import engine, get_session, warm_up_pool
 from edutrack.infrastructure.db.models import UserRole
+from edutrack.infrastructure.queue.publisher import email_publisher
 from edutrack.presentation.api.routes.v1 import router as v1_router
 
 logging.basicConfig(level=logging.INFO)
@@ -202,6 +203,12 @@ async def shutdown_handler() -> None:
     """Обработчик graceful shutdown."""
     logger.info("Начало graceful shutdown...")
 
+    # Закрываем соединение с RabbitMQ
+    try:
+        await email_publisher.close()
+    except Exception as e:
+        logger.error(f"Ошибка при закрытии RabbitMQ: {e}", exc_info=True)
+
     # Закрываем Redis соединения
     try:
         await close_redis()
@@ -226,6 +233,16 @@ async def lifespan(app: FastAPI):
     Выполняет graceful shutdown при остановке приложения.
     """
     # Startup
+    check_accelerators()
+    # Соединение с RabbitMQ и очередь готовим заранее; при ошибке публикатор подключится при первой отправке
+    try:
+        await email_publisher.start()
+    except Exception as e:
+        logger.warning(f"RabbitMQ недоступен при старте: {e}. Подключимся при первой публикации.")
+    try:
+        await warm_up_pool()
+    except Exception as e:
+        logger.warning(f"Не удалось заранее открыть соединения с БД: {e}. Подключимся при первом запросе.")
     logger.info("Приложение запущено")
     yield
     # Shutdown
@@ -1,6 +1,7 @@
+import hashlib
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from edutrack.application.auth import AuthService
@@ -65,6 +66,15 @@ from edutrack.presentation.api.schemas import (
 router = APIRouter(prefix="/api/v1", tags=["v1"])
 
 
+def _json_response(request: Request, body: bytes) -> Response:
+    """Ответ с готовым JSON и ETag; если у клиента та же версия - 304 без тела."""
+    etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
 @router.post("/auth/login", response_model=TokenResponse, tags=["auth"])
 async def login(payload: LoginRequest, session: AsyncSession = Depends(get_session)):
     service = AuthService(session)
@@ -126,12 +136,13 @@ async def create_subject(
 
 @router.get("/subjects", response_model=list[SubjectResponse], tags=["staff"])
 async def list_subjects(
+    request: Request,
     session: AsyncSession = Depends(get_session),
     _user=Depends(require_staff),
 ):
     service = SubjectService(session)
-    subjects = await service.list_subjects()
-    return [SubjectResponse(id=UUID(s["id"]), name=s["name"]) for s in subjects]
+    # Сервис отдает готовый JSON, повторно его не разбираем и не сериализуем
+    return _json_response(request, await service.list_subjects())
 
 
 @router.post("/lessons", response_model=LessonResponse, status_code=status.HTTP_201_CREATED, tags=["staff"])
@@ -184,17 +195,16 @@ async def create_grade(
 
 
 @router.get("/students/{student_id}/grades", response_model=GradeList, tags=["staff"])
-async def list_student_grades(student_id: UUID, session: AsyncSession = Depends(get_session), _user=Depends(require_staff)):
+async def list_student_grades(
+    student_id: UUID,
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+    _user=Depends(require_staff),
+):
     service = GradeService(session)
+    # Сервис отдает готовый JSON списка оценок, остается только обернуть его в items
     grades = await service.list_grades(student_id=student_id)
-    return GradeList(items=[GradeResponse(**g) if isinstance(g, dict) else GradeResponse(
-        id=g.id,
-        student_id=g.student_id,
-        lesson_id=g.lesson_id,
-        value=g.value,
-        comment=g.comment,
-        created_at=g.created_at,
-    ) for g in grades])
+    return _json_response(request, b'{"items":' + grades + b"}")
 
 
 @router.post("/messages", response_model=MessageResponse, status_code=status.HTTP_201_CREATED, tags=["user"])
@@ -409,16 +419,12 @@ async def create_news(
         preview_image_url=payload.preview_image_url,
         published_at=payload.published_at,
     )
-    # Получаем автора для имени
-    from edutrack.infrastructure.repositories.sqlalchemy import SqlAlchemyUserRepository
-    user_repo = SqlAlchemyUserRepository(session)
-    author = await user_repo.get_by_id(current_user.id)
-
     return NewsResponse(
         id=news_item.id,
         school_id=news_item.school_id,
         author_id=news_item.author_id,
-        author_name=author.full_name if author else "Неизвестно",
+        # Автор - текущий пользователь, он уже загружен при аутентификации
+        author_name=current_user.full_name,
         title=news_item.title,
         content=news_item.content,
         preview_image_url=news_item.preview_image_url,
@@ -455,11 +461,7 @@ async def get_news(
 ):
     service = NewsService(session)
     news_item = await service.get_news(news_id)
-
-    # Получаем автора для имени
-    from edutrack.infrastructure.repositories.sqlalchemy import SqlAlchemyUserRepository
-    user_repo = SqlAlchemyUserRepository(session)
-    author = await user_repo.get_by_id(news_item.author_id)
+    author = news_item.author
 
     return NewsResponse(
         id=news_item.id,
@@ -575,21 +577,16 @@ async def get_performance(
     service = PerformanceService(session)
     statistics = await service.get_performance(student_id, month, year)
 
-    # Получаем названия предметов
-    from edutrack.infrastructure.db.models import Subject
-    result_items = []
-    for stat in statistics:
-        stmt = select(Subject).where(Subject.id == stat["subject_id"])
-        subject = await session.scalar(stmt)
-
-        result_items.append(
-            GradeStatistics(
-                subject_id=stat["subject_id"],
-                subject_name=subject.name if subject else "Неизвестный предмет",
-                grade_count=stat["grade_count"],
-                average_grade=stat["average_grade"],
-                grades=stat["grades"],
-            )
+    # Названия предметов приходят из того же запроса, что и статистика
+    result_items = [
+        GradeStatistics(
+            subject_id=stat["subject_id"],
+            subject_name=stat["subject_name"],
+            grade_count=stat["grade_count"],
+            average_grade=stat["average_grade"],
+            grades=stat["grades"],
         )
+        for stat in statistics
+    ]
 
     return PerformanceResponse(month=month, year=year, statistics=result_items)
@@ -115,19 +115,19 @@ class RepositoryMocks:
         return UserRepo()
 
     @staticmethod
-    def create_token_repo(tokens_by_token=None, created_tokens=None):
+    def create_token_repo(tokens_by_hash=None, created_tokens=None):
         """Создает мок PasswordResetTokenRepository."""
-        tokens_by_token = tokens_by_token or {}
+        tokens_by_hash = tokens_by_hash or {}
         created_tokens = created_tokens or []
         mark_as_used_calls = []
 
         class TokenRepo:
-            async def get_by_token(self, token):
-                return tokens_by_token.get(token)
+            async def get_by_token_hash(self, token_hash):
+                return tokens_by_hash.get(token_hash)
 
-            async def create_token(self, user_id, token, expires_at):
+            async def create_token(self, user_id, token_hash, expires_at):
                 token_obj = SimpleNamespace(
-                    id=uuid4(), user_id=user_id, token=token, expires_at=expires_at
+                    id=uuid4(), user_id=user_id, token_hash=token_hash, expires_at=expires_at
                 )
                 created_tokens.append(token_obj)
                 return token_obj
@@ -1,4 +1,5 @@
 """Общие патчи для тестов."""
+import json
 from contextlib import contextmanager
 from unittest.mock import AsyncMock, patch
 
@@ -28,30 +29,74 @@ def patch_cache(cache_hit=False, cache_data=None):
     """Патч для функций кэширования."""
     cache_set_calls = []
     invalidate_calls = []
+    bump_calls = []
 
-    async def fake_get_cache(key):
+    # В кеше хранится готовый JSON
+    async def fake_get_cache(key, local_ttl=0):
+        return json.dumps(cache_data).encode() if cache_hit else None
+
+    async def fake_set_cache(key, value, ttl_seconds, local_ttl=0):
+        cache_set_calls.append({"key": key, "value": value, "ttl": ttl_seconds})
+
+    async def fake_invalidate(*keys):
+        invalidate_calls.extend(keys)
+
+    # Успеваемость кешируется как структура, а не как готовый JSON
+    async def fake_get_cache_value(key):
         return cache_data if cache_hit else None
 
-    async def fake_set_cache(key, value, ttl_seconds):
+    async def fake_set_cache_value(key, value, ttl_seconds):
         cache_set_calls.append({"key": key, "value": value, "ttl": ttl_seconds})
 
-    async def fake_invalidate(key):
-        invalidate_calls.append(key)
+    async def fake_get_version(name):
+        return "0"
+
+    async def fake_bump_version(name):
+        bump_calls.append(name)
 
     # Патчим в разных модулях
-    with patch("edutrack.application.grades.get_cache", side_effect=fake_get_cache), \
-         patch("edutrack.application.grades.set_cache", side_effect=fake_set_cache), \
+    with patch("edutrack.application.grades.get_cache_raw", side_effect=fake_get_cache), \
+         patch("edutrack.application.grades.set_cache_raw", side_effect=fake_set_cache), \
          patch("edutrack.application.grades.invalidate", side_effect=fake_invalidate), \
-         patch("edutrack.application.schools.get_cache", side_effect=fake_get_cache), \
-         patch("edutrack.application.schools.set_cache", side_effect=fake_set_cache), \
-         patch("edutrack.application.schools.invalidate", side_effect=fake_invalidate), \
-         patch("edutrack.application.lessons.get_cache", side_effect=fake_get_cache), \
-         patch("edutrack.application.lessons.set_cache", side_effect=fake_set_cache), \
-         patch("edutrack.application.lessons.invalidate", side_effect=fake_invalidate):
+         patch("edutrack.application.schools.get_cache_raw", side_effect=fake_get_cache), \
+         patch("edutrack.application.schools.set_cache_raw", side_effect=fake_set_cache), \
+         patch("edutrack.application.schools.get_version", side_effect=fake_get_version), \
+         patch("edutrack.application.schools.bump_version", side_effect=fake_bump_version), \
+         patch("edutrack.application.lessons.get_cache_raw", side_effect=fake_get_cache), \
+         patch("edutrack.application.lessons.set_cache_raw", side_effect=fake_set_cache), \
+         patch("edutrack.application.lessons.invalidate", side_effect=fake_invalidate), \
+         patch("edutrack.application.performance.get_cache", side_effect=fake_get_cache_value), \
+         patch("edutrack.application.performance.set_cache", side_effect=fake_set_cache_value):
         yield {
             "get_cache": fake_get_cache,
             "set_cache": fake_set_cache,
             "invalidate": fake_invalidate,
             "set_calls": cache_set_calls,
             "invalidate_calls": invalidate_calls,
+            "bump_calls": bump_calls,
+        }
+
+
+@contextmanager
+def patch_login_attempts(failed=None):
+    """Патч для счетчика неудачных попыток входа."""
+    increment_calls = []
+    invalidate_calls = []
+
+    async def fake_get_cache(key):
+        return failed
+
+    async def fake_increment(key, ttl_seconds):
+        increment_calls.append({"key": key, "ttl": ttl_seconds})
+        return (failed or 0) + 1
+
+    async def fake_invalidate(key):
+        invalidate_calls.append(key)
+
+    with patch("edutrack.application.auth.get_cache", side_effect=fake_get_cache), \
+         patch("edutrack.application.auth.increment", side_effect=fake_increment), \
+         patch("edutrack.application.auth.invalidate", side_effect=fake_invalidate):
+        yield {
+            "increment_calls": increment_calls,
+            "invalidate_calls": invalidate_calls,
         }
@@ -1,4 +1,6 @@
 """Тесты для email сервисов и других модулей с низким покрытием."""
+import asyncio
+import json
 from datetime import UTC
 from types import SimpleNamespace
 from unittest.mock import AsyncMock, MagicMock, patch
@@ -8,10 +10,13 @@ import pytest
 from edutrack.application.messages import MessageService
 from edutrack.application.password_reset import PasswordResetService
 from edutrack.infrastructure.email.sender import send_email
-from edutrack.infrastructure.services.security import hash_password, verify_password
+from edutrack.infrastructure.services.security import (
+    hash_password,
+    hash_reset_token,
+    verify_password,
+)
 from helpers.assertions import assert_http_exception_async
 from helpers.factories import (
-    GradeFactory,
     LessonFactory,
     MessageFactory,
     UserFactory,
@@ -62,13 +67,13 @@ async def test_password_reset_service_reset_password(monkeypatch):
     reset_token = SimpleNamespace(
         id=uuid4(),
         user_id=user.id,
-        token=token,
+        token_hash=hash_reset_token(token),
         used=False,
         expires_at=None
     )
 
     token_repo = RepositoryMocks.create_token_repo(
-        tokens_by_token={token: reset_token}
+        tokens_by_hash={reset_token.token_hash: reset_token}
     )
     user_repo = RepositoryMocks.create_user_repo(users_by_id={user.id: user})
 
@@ -93,12 +98,12 @@ async def test_password_reset_service_reset_password_user_not_found(monkeypatch)
     reset_token = SimpleNamespace(
         id=uuid4(),
         user_id=user_id,
-        token=token,
+        token_hash=hash_reset_token(token),
         used=False,
         expires_at=None
     )
 
-    token_repo = RepositoryMocks.create_token_repo(tokens_by_token={token: reset_token})
+    token_repo = RepositoryMocks.create_token_repo(tokens_by_hash={reset_token.token_hash: reset_token})
     user_repo = RepositoryMocks.create_user_repo(users_by_id={})
 
     session = DummySession()
@@ -116,7 +121,7 @@ async def test_password_reset_service_reset_password_user_not_found(monkeypatch)
 @pytest.mark.asyncio
 async def test_password_reset_service_reset_password_invalid_token(monkeypatch):
     """Тест сброса пароля с недействительным токеном."""
-    token_repo = RepositoryMocks.create_token_repo(tokens_by_token={})
+    token_repo = RepositoryMocks.create_token_repo(tokens_by_hash={})
 
     session = DummySession()
     service = PasswordResetService(session)
@@ -128,6 +133,21 @@ async def test_password_reset_service_reset_password_invalid_token(monkeypatch):
     )
 
 
+@pytest.mark.asyncio
+async def test_password_reset_service_reset_password_non_ascii_token(monkeypatch):
+    """Токен с не-ASCII символами - обычный промах поиска (400), а не 500."""
+    token_repo = RepositoryMocks.create_token_repo(tokens_by_hash={})
+
+    session = DummySession()
+    service = PasswordResetService(session)
+    service.tokens = token_repo
+
+    await assert_http_exception_async(
+        service.reset_password("токен", "new_password"),
+        status_code=400
+    )
+
+
 @pytest.mark.asyncio
 async def test_security_hash_and_verify_password():
     """Тест хеширования и проверки паролей."""
@@ -182,9 +202,11 @@ async def test_message_service_enqueue_email(monkeypatch):
                 'status': type('obj', (object,), {'value': 'pending'})()
             })()
 
+    published = []
+
     class Pub:
-        async def publish_outbox(self, outbox_id):
-            pass
+        async def publish_outbox(self, payload):
+            published.append(payload)
 
     session = DummySession()
     service = MessageService(session)
@@ -196,6 +218,10 @@ async def test_message_service_enqueue_email(monkeypatch):
 
     assert outbox.id == outbox_id
     assert session.committed
+    # Письмо публикуется целиком, воркеру не нужно читать outbox
+    assert published == [
+        {"outbox_id": str(outbox_id), "recipients": ["test@example.com"], "subject": "Test", "body": "Body"}
+    ]
 
 
 @pytest.mark.asyncio
@@ -260,34 +286,32 @@ async def test_send_email_multiple_recipients(monkeypatch):
 @pytest.mark.asyncio
 async def test_performance_service_get_performance(monkeypatch):
     """Тест получения успеваемости студента."""
-    from datetime import datetime
-
     from edutrack.application.performance import PerformanceService
 
     student_id = uuid4()
     subject_id = uuid4()
 
-    # Мокаем результат запроса
-    grade = GradeFactory.create_grade(
-        value=5,
-        created_at=datetime(2024, 1, 15, tzinfo=UTC)
-    )
-    lesson = LessonFactory.create_lesson(subject_id=subject_id)
-    subject = type('obj', (object,), {'id': subject_id, 'name': 'Math'})()
-
+    # Мокаем результат запроса: агрегаты по предмету считает Postgres
     mock_result = MagicMock()
-    mock_result.all.return_value = [(grade, lesson, subject)]
+    mock_result.all.return_value = [(subject_id, "Math", 2, 4.5, [4, 5])]
 
     session = DummySession()
     session.execute = AsyncMock(return_value=mock_result)
 
     service = PerformanceService(session)
-    result = await service.get_performance(student_id, month=1, year=2024)
+    with patch_cache(cache_hit=False) as cache_mocks:
+        result = await service.get_performance(student_id, month=1, year=2024)
+
+    # Прошедший месяц кешируется надолго
+    assert cache_mocks["set_calls"][0]["key"] == f"cache:perf:{student_id}:2024:1"
+    assert cache_mocks["set_calls"][0]["ttl"] == 7 * 24 * 3600
 
     assert len(result) == 1
+    assert result[0]["subject_id"] == subject_id
     assert result[0]["subject_name"] == "Math"
-    assert result[0]["average_grade"] == 5.0
-    assert result[0]["grade_count"] == 1
+    assert result[0]["average_grade"] == 4.5
+    assert result[0]["grade_count"] == 2
+    assert result[0]["grades"] == [4, 5]
 
 
 @pytest.mark.asyncio
@@ -319,63 +343,54 @@ async def test_performance_service_no_grades(monkeypatch):
     session.execute = AsyncMock(return_value=mock_result)
 
     service = PerformanceService(session)
-    result = await service.get_performance(student_id, month=1, year=2024)
+    with patch_cache(cache_hit=False):
+        result = await service.get_performance(student_id, month=1, year=2024)
 
     assert result == []
 
 
+@pytest.mark.asyncio
+async def test_performance_service_cache_hit(monkeypatch):
+    """Тест получения успеваемости из кеша без запроса к БД."""
+    from edutrack.application.performance import PerformanceService
+
+    cached = [{"subject_id": str(uuid4()), "subject_name": "Math", "grade_count": 1, "average_grade": 5.0, "grades": [5]}]
+
+    session = DummySession()
+    session.execute = AsyncMock()
+
+    service = PerformanceService(session)
+    with patch_cache(cache_hit=True, cache_data=cached):
+        result = await service.get_performance(uuid4(), month=1, year=2024)
+
+    assert result == cached
+    session.execute.assert_not_called()
+
+
 @pytest.mark.asyncio
 async def test_classmates_service_get_classmates(monkeypatch):
     """Тест получения одноклассников."""
     from edutrack.application.classmates import ClassmatesService
 
     student_id = uuid4()
-    class_id = uuid4()
     classmate_id = uuid4()
 
-    student = SimpleNamespace(id=student_id)
     classmate = SimpleNamespace(id=classmate_id)
 
-    class StudentRepo:
-        async def get(self, sid):
-            return student
-
-    # Мокаем scalars для получения class_ids
-    mock_class_ids = MagicMock()
-    mock_class_ids.all.return_value = [class_id]
-
-    # Мокаем scalars для получения одноклассников
+    # Одноклассники получаются одним запросом
     mock_classmates = MagicMock()
     mock_classmates.unique.return_value.all.return_value = [classmate]
 
     session = DummySession()
-    session.scalars = AsyncMock(side_effect=[mock_class_ids, mock_classmates])
+    session.scalars = AsyncMock(return_value=mock_classmates)
 
     service = ClassmatesService(session)
-    service.students = StudentRepo()
 
     result = await service.get_classmates(student_id)
 
     assert len(result) == 1
     assert result[0].id == classmate_id
-
-
-@pytest.mark.asyncio
-async def test_classmates_service_no_student(monkeypatch):
-    """Тест получения одноклассников для несуществующего студента."""
-    from edutrack.application.classmates import ClassmatesService
-
-    class StudentRepo:
-        async def get(self, sid):
-            return None
-
-    session = DummySession()
-    service = ClassmatesService(session)
-    service.students = StudentRepo()
-
-    result = await service.get_classmates(uuid4())
-
-    assert result == []
+    session.scalars.assert_awaited_once()
 
 
 @pytest.mark.asyncio
@@ -383,23 +398,15 @@ async def test_classmates_service_no_classes(monkeypatch):
     """Тест получения одноклассников для студента без классов."""
     from edutrack.application.classmates import ClassmatesService
 
-    student_id = uuid4()
-    student = SimpleNamespace(id=student_id)
-
-    class StudentRepo:
-        async def get(self, sid):
-            return student
-
-    mock_class_ids = MagicMock()
-    mock_class_ids.all.return_value = []
+    mock_classmates = MagicMock()
+    mock_classmates.unique.return_value.all.return_value = []
 
     session = DummySession()
-    session.scalars = AsyncMock(return_value=mock_class_ids)
+    session.scalars = AsyncMock(return_value=mock_classmates)
 
     service = ClassmatesService(session)
-    service.students = StudentRepo()
 
-    result = await service.get_classmates(student_id)
+    result = await service.get_classmates(uuid4())
 
     assert result == []
 
@@ -447,7 +454,7 @@ async def test_lesson_service_list_schedule_cache_hit(monkeypatch):
     with patch_cache(cache_hit=True, cache_data=cached_data):
         result = await service.list_schedule(class_id)
 
-    assert result == cached_data
+    assert json.loads(result) == cached_data
 
 
 @pytest.mark.asyncio
@@ -467,7 +474,7 @@ async def test_lesson_service_list_schedule_cache_miss(monkeypatch):
     service.repo = LessonRepo()
 
     with patch_cache(cache_hit=False):
-        result = await service.list_schedule(class_id)
+        result = json.loads(await service.list_schedule(class_id))
 
     assert len(result) == 1
     assert result[0]["topic"] == "Test Lesson"
@@ -508,3 +515,51 @@ async def test_security_create_access_token(monkeypatch):
         expected_exp = now + timedelta(minutes=30)
         # Допускаем разницу в 5 секунд (время выполнения теста)
         assert abs((exp_time - expected_exp).total_seconds()) < 5
+
+
+@pytest.mark.asyncio
+async def test_batching_publisher_groups_concurrent_publishes():
+    """Тест объединения одновременных публикаций в одну пачку."""
+    from edutrack.infrastructure.queue.publisher import BatchingEmailPublisher
+
+    published = []
+
+    class Pub:
+        async def publish_outbox_batch(self, payloads):
+            published.append([payload["outbox_id"] for payload in payloads])
+
+        async def close(self):
+            pass
+
+    publisher = BatchingEmailPublisher(Pub(), max_batch=10, max_linger=0.05)
+    await asyncio.gather(*(publisher.publish_outbox({"outbox_id": str(i)}) for i in range(3)))
+    await publisher.close()
+
+    assert published == [["0", "1", "2"]]
+
+
+@pytest.mark.asyncio
+async def test_batching_publisher_propagates_errors():
+    """Тест передачи ошибки публикации всем ожидающим в пачке."""
+    from edutrack.infrastructure.queue.publisher import BatchingEmailPublisher
+
+    class Pub:
+        async def publish_outbox_batch(self, payloads):
+            raise ConnectionError("RabbitMQ недоступен")
+
+        async def close(self):
+            pass
+
+    publisher = BatchingEmailPublisher(Pub(), max_linger=0)
+    with pytest.raises(ConnectionError):
+        await publisher.publish_outbox({"outbox_id": "1"})
+    await publisher.close()
+
+
+def test_outbox_payload_skips_large_body():
+    """Большое письмо не кладем в сообщение очереди - только ссылку на outbox."""
+    from edutrack.infrastructure.queue.publisher import MAX_INLINE_BODY, outbox_payload
+
+    payload = outbox_payload("1", ["a@example.com"], "Subject", "x" * (MAX_INLINE_BODY + 1))
+
+    assert payload == {"outbox_id": "1"}
@@ -1,6 +1,6 @@
 """Тесты для новых функций."""
 from datetime import date
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from uuid import uuid4
 
 import pytest
@@ -9,6 +9,7 @@ from edutrack.application.interim_assessment import InterimAssessmentService
 from edutrack.application.news import NewsService
 from edutrack.application.password_reset import PasswordResetService
 from edutrack.application.profile import ProfileService
+from edutrack.infrastructure.services.security import hash_reset_token
 from helpers.assertions import assert_http_exception_async
 from helpers.factories import AssessmentFactory, NewsFactory, UserFactory
 from helpers.mocks import RepositoryMocks
@@ -43,14 +44,17 @@ async def test_password_reset_service(session):
     assert len(token_repo.created_tokens) == 1
     token = token_repo.created_tokens[0]
     assert token.user_id == user.id
-    assert len(token.token) > 30  # URL-safe токен из 32 байт
+    assert len(token.token_hash) == 32  # В БД хранится только SHA-256 токена
     assert token.expires_at is not None
 
     # Проверяем, что email отправлен
     assert email_called["called"] is True
     assert email_called["recipients"] == ["test@example.com"]
     assert email_called["subject"] == "Восстановление пароля"
-    assert token.token in email_called["body"]  # Токен должен быть в теле письма
+    # В письме - сам токен, а не его хеш
+    sent_token = email_called["body"].split("token=")[1].split()[0]
+    assert len(sent_token) > 30  # URL-safe токен из 32 байт
+    assert hash_reset_token(sent_token) == token.token_hash
 
 
 @pytest.mark.asyncio
@@ -155,6 +159,20 @@ async def test_direct_message_service_send_to_self(session):
     service.messages.create_message.assert_not_called()
 
 
+@pytest.mark.asyncio
+async def test_direct_message_service_mark_as_read_not_recipient(session):
+    """Тест: отметить прочитанным может только получатель."""
+    service = DirectMessageService(session)
+    service.messages = MagicMock()
+    service.messages.mark_as_read = AsyncMock(return_value=False)
+
+    await assert_http_exception_async(
+        service.mark_as_read(message_id=uuid4(), user_id=uuid4()),
+        status_code=403,
+    )
+    assert not session.committed
+
+
 @pytest.mark.asyncio
 async def test_news_service(session):
     """Тест новостей."""
@@ -1,3 +1,4 @@
+import json
 from datetime import UTC
 from types import SimpleNamespace
 from uuid import uuid4
@@ -8,7 +9,7 @@ from edutrack.application.grades import GradeService
 from edutrack.application.messages import MessageService
 from edutrack.application.schools import SchoolService
 from helpers.mocks import DummySession
-from helpers.patches import patch_cache
+from helpers.patches import patch_cache, patch_login_attempts
 
 
 @pytest.mark.asyncio
@@ -29,8 +30,11 @@ async def test_auth_service_success(monkeypatch):
 
     service = AuthService(session=None)  # type: ignore
     service.users = Repo()  # type: ignore
-    token = await service.authenticate(email="user@example.com", password="secret")
+    with patch_login_attempts(failed=3) as attempts:
+        token = await service.authenticate(email="user@example.com", password="secret")
     assert isinstance(token, str) and len(token) > 10
+    # Успешный вход сбрасывает счетчик неудачных попыток
+    assert attempts["invalidate_calls"] == ["auth:fail:user@example.com"]
 
 
 @pytest.mark.asyncio
@@ -53,11 +57,38 @@ async def test_auth_service_invalid_password(monkeypatch):
     service.users = Repo()  # type: ignore
 
     from fastapi import HTTPException
-    with pytest.raises(HTTPException) as exc_info:
+    with patch_login_attempts() as attempts, pytest.raises(HTTPException) as exc_info:
         await service.authenticate(email="user@example.com", password="wrong_password")
 
     assert exc_info.value.status_code == 401
     assert "credentials" in exc_info.value.detail.lower()
+    assert len(attempts["increment_calls"]) == 1
+
+
+@pytest.mark.asyncio
+async def test_auth_service_too_many_attempts(monkeypatch):
+    """Тест блокировки входа после превышения числа неудачных попыток."""
+    from edutrack.application.auth import MAX_FAILED_LOGINS
+
+    def mock_verify_password(plain: str, hashed: str) -> bool:
+        raise AssertionError("verify_password should not be called when login is blocked")
+
+    class Repo:
+        async def get_by_email(self, email):
+            raise AssertionError("get_by_email should not be called when login is blocked")
+
+    monkeypatch.setattr(
+        "edutrack.application.auth.verify_password", mock_verify_password
+    )
+
+    service = AuthService(session=None)  # type: ignore
+    service.users = Repo()  # type: ignore
+
+    from fastapi import HTTPException
+    with patch_login_attempts(failed=MAX_FAILED_LOGINS), pytest.raises(HTTPException) as exc_info:
+        await service.authenticate(email="User@Example.com", password="secret")
+
+    assert exc_info.value.status_code == 429
 
 
 @pytest.mark.asyncio
@@ -78,7 +109,7 @@ async def test_auth_service_user_not_found(monkeypatch):
     service.users = Repo()  # type: ignore
 
     from fastapi import HTTPException
-    with pytest.raises(HTTPException) as exc_info:
+    with patch_login_attempts(), pytest.raises(HTTPException) as exc_info:
         await service.authenticate(email="nonexistent@example.com", password="secret")
 
     assert exc_info.value.status_code == 401
@@ -102,10 +133,10 @@ async def test_grade_service_cache(monkeypatch):
         raise AssertionError("set_cache should not be called when cache hit")
 
     with patch_cache(cache_hit=True, cache_data=cached_payload):
-        monkeypatch.setattr("edutrack.application.grades.set_cache", fake_set_cache)
+        monkeypatch.setattr("edutrack.application.grades.set_cache_raw", fake_set_cache)
         result = await service.list_grades(student_id)
 
-    assert result == cached_payload
+    assert json.loads(result) == cached_payload
 
 
 @pytest.mark.asyncio
@@ -132,9 +163,9 @@ async def test_message_service_enqueue(monkeypatch):
             self.called = False
             self.last = None
 
-        async def publish_outbox(self, oid):
+        async def publish_outbox(self, payload):
             self.called = True
-            self.last = oid
+            self.last = payload
 
     session = DummySession()
     service = MessageService(session=session)  # type: ignore
@@ -145,7 +176,8 @@ async def test_message_service_enqueue(monkeypatch):
 
     outbox = await service.enqueue_email(message_id=msg_id, recipients_emails=["a@b.com"])
     assert outbox.id == outbox_id
-    assert publisher.called and publisher.last == str(outbox_id)
+    assert publisher.called and publisher.last["outbox_id"] == str(outbox_id)
+    assert publisher.last["subject"] == "Hello"
 
 
 @pytest.mark.asyncio
@@ -164,10 +196,11 @@ async def test_school_service_caching(monkeypatch):
 
     with patch_cache(cache_hit=False) as cache_mocks:
         await service.create_school("S1", None)
-        assert len(cache_mocks["invalidate_calls"]) == 1
+        assert cache_mocks["bump_calls"] == ["schools"]
         assert session.committed is True
-        schools = await service.list_schools()
+        schools = json.loads(await service.list_schools())
         assert len(schools) == 1
+        assert cache_mocks["set_calls"][0]["key"] == "cache:schools:v0"
 
 
 @pytest.mark.asyncio
@@ -194,10 +227,11 @@ async def test_grade_service_cache_miss(monkeypatch):
     service.repo = Repo()  # type: ignore
 
     with patch_cache(cache_hit=False) as cache_mocks:
-        result = await service.list_grades(student_id)
+        result = json.loads(await service.list_grades(student_id))
 
     # Проверяем, что данные получены из репозитория
     assert len(result) == 1
+    assert result[0]["student_id"] == str(student_id)
     assert result[0]["id"] == str(grade.id)
     assert result[0]["value"] == 5
     assert result[0]["comment"] == "Отлично"
@@ -206,3 +240,231 @@ async def test_grade_service_cache_miss(monkeypatch):
     assert len(cache_mocks["set_calls"]) == 1
     assert cache_mocks["set_calls"][0]["key"] == f"cache:grades:{student_id}"
     assert cache_mocks["set_calls"][0]["ttl"] == 60  # GRADES_TTL
+
+
+def test_json_response_etag():
+    """Готовый JSON отдается с ETag, совпавший If-None-Match дает 304."""
+    from edutrack.presentation.api.routes.v1 import _json_response
+    from starlette.requests import Request
+
+    def make_request(headers=()):
+        return Request({"type": "http", "headers": [(k.encode(), v.encode()) for k, v in headers]})
+
+    response = _json_response(make_request(), b'[{"id":"1"}]')
+    assert response.status_code == 200
+    assert response.body == b'[{"id":"1"}]'
+    etag = response.headers["etag"]
+
+    not_modified = _json_response(make_request([("if-none-match", etag)]), b'[{"id":"1"}]')
+    assert not_modified.status_code == 304
+    assert not_modified.body == b""
+
+
+@pytest.mark.asyncio
+async def test_grade_service_create_invalidates_caches(monkeypatch):
+    """Создание оценки сбрасывает кеш оценок и успеваемости за месяц."""
+    from datetime import datetime
+
+    created_at = datetime(2024, 3, 15, tzinfo=UTC)
+    student_id = uuid4()
+
+    class Repo:
+        async def create_grade(self, student_id, lesson_id, value, comment):
+            return SimpleNamespace(id=uuid4(), student_id=student_id, created_at=created_at)
+
+    session = DummySession()
+    service = GradeService(session=session)  # type: ignore
+    service.repo = Repo()  # type: ignore
+
+    with patch_cache() as cache_mocks:
+        await service.create_grade(student_id, uuid4(), 5, None)
+
+    assert session.committed is True
+    assert cache_mocks["invalidate_calls"] == [f"cache:grades:{student_id}", f"cache:perf:{student_id}:2024:3"]
+
+
+@pytest.mark.asyncio
+async def test_get_cache_many_single_mget(monkeypatch):
+    """Несколько ключей читаются одним MGET; пропуски и битые значения - None."""
+    import importlib
+
+    # Пакет cache реэкспортирует клиент под именем redis, поэтому модуль берем через importlib
+    cache = importlib.import_module("edutrack.infrastructure.cache.redis")
+
+    calls = []
+
+    async def fake_mget(keys):
+        calls.append(list(keys))
+        return [b'{"id":"1"}', None, b"not json"]
+
+    monkeypatch.setattr(cache.redis, "mget", fake_mget)
+
+    result = await cache.get_cache_many(["a", "b", "c"])
+
+    assert calls == [["a", "b", "c"]]
+    assert result == [{"id": "1"}, None, None]
+
+
+@pytest.mark.asyncio
+async def test_cache_raw_compresses_large_values(monkeypatch):
+    """Крупные значения хранятся сжатыми и читаются прозрачно, мелкие - как есть."""
+    import importlib
+
+    cache = importlib.import_module("edutrack.infrastructure.cache.redis")
+
+    storage = {}
+
+    async def fake_set(key, value, ex=None):
+        storage[key] = value
+
+    async def fake_get(key):
+        return storage.get(key)
+
+    monkeypatch.setattr(cache.redis, "set", fake_set)
+    monkeypatch.setattr(cache.redis, "get", fake_get)
+
+    large = cache.dump_json([{"name": "Школа"}] * 200)
+    small = b'{"items":[]}'
+
+    await cache.set_cache_raw("large", large, ttl_seconds=60)
+    await cache.set_cache_raw("small", small, ttl_seconds=60)
+
+    assert len(storage["large"]) < len(large)
+    assert storage["small"] == small
+    assert await cache.get_cache_raw("large") == large
+    assert await cache.get_cache_raw("small") == small
+
+
+@pytest.mark.asyncio
+async def test_cache_raw_local_layer(monkeypatch):
+    """С local_ttl повторное чтение не идет в Redis, invalidate сбрасывает локальную копию."""
+    import importlib
+
+    cache = importlib.import_module("edutrack.infrastructure.cache.redis")
+    monkeypatch.setattr(cache, "_local", type(cache._local)())
+
+    calls = []
+
+    async def fake_get(key):
+        calls.append(key)
+        return b"[]"
+
+    async def fake_delete(*keys):
+        pass
+
+    monkeypatch.setattr(cache.redis, "get", fake_get)
+    monkeypatch.setattr(cache.redis, "delete", fake_delete)
+
+    assert await cache.get_cache_raw("cache:schools:v1", local_ttl=60) == b"[]"
+    assert await cache.get_cache_raw("cache:schools:v1", local_ttl=60) == b"[]"
+    assert calls == ["cache:schools:v1"]
+
+    await cache.invalidate("cache:schools:v1")
+    await cache.get_cache_raw("cache:schools:v1", local_ttl=60)
+    assert calls == ["cache:schools:v1", "cache:schools:v1"]
+
+
+@pytest.mark.asyncio
+async def test_cache_circuit_breaker_skips_redis(monkeypatch):
+    """После серии ошибок соединения кеш перестает обращаться к Redis."""
+    import importlib
+
+    from redis.exceptions import ConnectionError as RedisConnectionError
+
+    cache = importlib.import_module("edutrack.infrastructure.cache.redis")
+    monkeypatch.setattr(cache, "_breaker", cache._CircuitBreaker(failure_threshold=2))
+
+    calls = []
+
+    async def failing_get(key):
+        calls.append(key)
+        raise RedisConnectionError("connection refused")
+
+    monkeypatch.setattr(cache.redis, "get", failing_get)
+
+    for _ in range(4):
+        assert await cache.get_cache_raw("key") is None
+
+    assert calls == ["key", "key"]
+    assert cache._breaker.is_open
+
+
+@pytest.mark.asyncio
+async def test_cache_version_unavailable_bypasses_local_layer(monkeypatch):
+    """Если Redis недоступен, версии нет и список читается из БД, а не из локальной копии."""
+    import importlib
+
+    from redis.exceptions import ConnectionError as RedisConnectionError
+
+    cache = importlib.import_module("edutrack.infrastructure.cache.redis")
+    monkeypatch.setattr(cache, "_local", type(cache._local)())
+    monkeypatch.setattr(cache, "_breaker", cache._CircuitBreaker())
+
+    async def failing(*args, **kwargs):
+        raise RedisConnectionError("connection refused")
+
+    monkeypatch.setattr(cache.redis, "get", failing)
+    monkeypatch.setattr(cache.redis, "incr", failing)
+    cache._local_set("cache:schools:v0", b"[]", 600)
+
+    await cache.bump_version("schools")
+
+    assert await cache.get_version("schools") is None
+    assert "cache:schools:v0" not in cache._local
+
+
+def test_redis_uses_hiredis_parser():
+    """Ответы Redis разбирает C-парсер hiredis, а не реализация на Python."""
+    import importlib
+
+    from redis._parsers import _AsyncHiredisParser
+
+    cache = importlib.import_module("edutrack.infrastructure.cache.redis")
+
+    # Соединение создается без подключения к серверу
+    connection = cache.pool.make_connection()
+
+    assert isinstance(connection._parser, _AsyncHiredisParser)
+
+
+def test_check_accelerators_requires_hiredis(monkeypatch):
+    """Без hiredis приложение не стартует, а не работает молча на медленном парсере."""
+    import importlib
+
+    cache = importlib.import_module("edutrack.infrastructure.cache.redis")
+
+    cache.check_accelerators()
+
+    monkeypatch.setattr(cache, "HIREDIS_AVAILABLE", False)
+    with pytest.raises(RuntimeError, match="hiredis"):
+        cache.check_accelerators()
+
+
+@pytest.mark.asyncio
+async def test_attendance_upsert_for_lesson_statement():
+    """Посещаемость урока пишется одним INSERT ... ON CONFLICT по (lesson_id, student_id)."""
+    from edutrack.infrastructure.repositories.sqlalchemy import SqlAlchemyAttendanceRepository
+    from sqlalchemy.dialects import postgresql
+
+    executed = []
+
+    class Session:
+        async def execute(self, stmt):
+            executed.append(stmt)
+
+        async def flush(self):
+            pass
+
+    repo = SqlAlchemyAttendanceRepository(Session())
+    lesson_id = uuid4()
+    await repo.upsert_for_lesson(lesson_id, {uuid4(): "present", uuid4(): "absent"})
+
+    assert len(executed) == 1
+    sql = str(executed[0].compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT ON CONSTRAINT uq_attendance_lesson_student DO UPDATE" in sql
+    assert "SET status = excluded.status" in sql
+    assert sql.count("VALUES") == 1
+
+    # Пустой набор не отправляет запрос
+    await repo.upsert_for_lesson(lesson_id, {})
+    assert len(executed) == 1